@@ -0,0 +1,220 @@
+# Almacén de entidades en estructura de arrays (un array numpy por campo)
+#
+# Enemigos y cofres de un mapa viven aquí como columnas: posiciones, última
+# dirección, visión, turno del último paso... Enemigo y Cofre (entidades.py)
+# son solo vistas (almacén, id) sobre estas columnas. Así la persecución de
+# todos los enemigos se calcula en una pasada vectorizada por turno.
+#
+# Además se mantiene un índice espacial celda -> ids (enemigos vivos y cofres
+# cerrados), actualizado en cada alta, baja y movimiento, para que colisiones,
+# cofres y el dibujado de la vista no recorran todas las entidades.
+import numpy as np
+
+from entidades import Enemigo, Cofre
+from config import ENEMY_FLOW_MARGIN
+
+# Pasos candidatos de un enemigo: arriba, abajo, izquierda, derecha
+PASOS_X = np.array([-1, 1, 0, 0])
+PASOS_Y = np.array([0, 0, -1, 1])
+
+
+def _crecer(array, capacidad):
+    nuevo = np.zeros(capacidad, dtype=array.dtype)
+    nuevo[:len(array)] = array
+    return nuevo
+
+
+class AlmacenEntidades:
+    CAMPOS_ENEMIGO = (
+        ('ex', np.int32), ('ey', np.int32),
+        ('edx', np.int8), ('edy', np.int8),
+        ('vision', np.int16), ('ultimo_mov', np.int32),
+        ('vivo', bool),
+    )
+    CAMPOS_COFRE = (
+        ('cx', np.int32), ('cy', np.int32),
+        ('contenido', np.uint8), ('valor', np.int32),
+        ('abierto', bool),
+    )
+
+    def __init__(self, capacidad=16):
+        for nombre, tipo in self.CAMPOS_ENEMIGO + self.CAMPOS_COFRE:
+            setattr(self, nombre, np.zeros(capacidad, dtype=tipo))
+        self.n_enemigos = 0
+        self.n_cofres = 0
+        self.celda_enemigos = {}  # (x, y) -> [ids de enemigos vivos]
+        self.celda_cofre = {}     # (x, y) -> id del cofre cerrado
+
+    # --- Altas y bajas ---
+    def _reservar(self, campos, usados, extra):
+        capacidad = len(getattr(self, campos[0][0]))
+        if usados + extra <= capacidad:
+            return
+        capacidad = max(usados + extra, capacidad * 2)
+        for nombre, _ in campos:
+            setattr(self, nombre, _crecer(getattr(self, nombre), capacidad))
+
+    def agregar_enemigos(self, xs, ys, vision):
+        """Da de alta enemigos en (xs, ys); devuelve sus ids."""
+        xs = np.asarray(xs, dtype=np.int32)
+        k = len(xs)
+        self._reservar(self.CAMPOS_ENEMIGO, self.n_enemigos, k)
+        ids = np.arange(self.n_enemigos, self.n_enemigos + k)
+        self.ex[ids] = xs
+        self.ey[ids] = ys
+        self.edx[ids] = 0
+        self.edy[ids] = 0
+        self.vision[ids] = vision
+        self.ultimo_mov[ids] = 0
+        self.vivo[ids] = True
+        self.n_enemigos += k
+        for i in ids.tolist():
+            self._indexar_enemigo(i)
+        return ids
+
+    def agregar_cofres(self, xs, ys, contenidos, valores):
+        """Da de alta cofres; `contenidos` son códigos (índices de CONTENIDOS). Devuelve sus ids."""
+        xs = np.asarray(xs, dtype=np.int32)
+        k = len(xs)
+        self._reservar(self.CAMPOS_COFRE, self.n_cofres, k)
+        ids = np.arange(self.n_cofres, self.n_cofres + k)
+        self.cx[ids] = xs
+        self.cy[ids] = ys
+        self.contenido[ids] = contenidos
+        self.valor[ids] = valores
+        self.abierto[ids] = False
+        self.n_cofres += k
+        for i in ids.tolist():
+            self.celda_cofre[(int(self.cx[i]), int(self.cy[i]))] = i
+        return ids
+
+    def quitar_enemigo(self, id):
+        if self.vivo[id]:
+            self._desindexar_enemigo(id)
+            self.vivo[id] = False
+
+    def colocar_enemigo(self, id, x, y):
+        """Mueve un enemigo a (x, y) manteniendo el índice espacial."""
+        self._desindexar_enemigo(id)
+        self.ex[id] = x
+        self.ey[id] = y
+        self._indexar_enemigo(id)
+
+    def abrir_cofre(self, id):
+        self.abierto[id] = True
+        self.celda_cofre.pop((int(self.cx[id]), int(self.cy[id])), None)
+
+    # --- Índice espacial ---
+    def _indexar_enemigo(self, id):
+        self.celda_enemigos.setdefault((int(self.ex[id]), int(self.ey[id])), []).append(id)
+
+    def _desindexar_enemigo(self, id):
+        celda = (int(self.ex[id]), int(self.ey[id]))
+        ids = self.celda_enemigos[celda]
+        ids.remove(id)
+        if not ids:
+            del self.celda_enemigos[celda]
+
+    # --- Consultas ---
+    def ids_enemigos(self):
+        return np.flatnonzero(self.vivo[:self.n_enemigos])
+
+    def enemigos(self):
+        return [Enemigo(self, int(i)) for i in self.ids_enemigos()]
+
+    def cofres(self):
+        return [Cofre(self, i) for i in range(self.n_cofres)]
+
+    def enemigos_en(self, x, y):
+        """Enemigos vivos en la celda (x, y), en orden de alta."""
+        return [Enemigo(self, i) for i in sorted(self.celda_enemigos.get((x, y), ()))]
+
+    def cofre_en(self, x, y):
+        """Cofre cerrado en (x, y), o None."""
+        i = self.celda_cofre.get((x, y))
+        return None if i is None else Cofre(self, i)
+
+    def en_region(self, i0, i1, j0, j1):
+        """(cofres cerrados, enemigos vivos) dentro de [i0, i1) x [j0, j1).
+
+        Recorre las celdas del rectángulo o las entradas del índice, lo que
+        sea menor: el coste no crece con el total de entidades del mapa.
+        """
+        return (self._en_region(self.celda_cofre, i0, i1, j0, j1, lambda i: [Cofre(self, i)]),
+                self._en_region(self.celda_enemigos, i0, i1, j0, j1,
+                                lambda ids: [Enemigo(self, i) for i in ids]))
+
+    @staticmethod
+    def _en_region(indice, i0, i1, j0, j1, vistas):
+        resultado = []
+        if (i1 - i0) * (j1 - j0) < len(indice):
+            for x in range(i0, i1):
+                for y in range(j0, j1):
+                    valor = indice.get((x, y))
+                    if valor is not None:
+                        resultado += vistas(valor)
+        else:
+            for (x, y), valor in indice.items():
+                if i0 <= x < i1 and j0 <= y < j1:
+                    resultado += vistas(valor)
+        return resultado
+
+    # --- IA vectorizada ---
+    def mover_enemigos(self, mapa, jugador, turno):
+        """Paso de persecución de todos los enemigos a la vez.
+
+        Como antes, cada enemigo se mueve cada 2 turnos del jugador y solo si
+        lo ve (visión en caja). El paso sigue un único campo BFS calculado
+        desde el jugador (mapa.flujo_hacia), así que rodea muros en lugar de
+        quedarse atascado; entre pasos igual de buenos se prefiere el eje de
+        mayor distancia (el y en empate), que era el paso voraz de antes. Si
+        el jugador no es alcanzable dentro del campo se usa el paso voraz.
+        """
+        ids = self.ids_enemigos()
+        ids = ids[turno - self.ultimo_mov[ids] >= 2]
+        if ids.size == 0:
+            return ids
+        dist_x = jugador.x - self.ex[ids]
+        dist_y = jugador.y - self.ey[ids]
+        vision = self.vision[ids]
+        ve = (np.abs(dist_x) <= vision) & (np.abs(dist_y) <= vision)
+        ids, dist_x, dist_y = ids[ve], dist_x[ve], dist_y[ve]
+        if ids.size == 0:
+            return ids
+        ex, ey = self.ex[ids], self.ey[ids]
+        # Paso voraz: eje de mayor distancia (el y en empate)
+        por_x = np.abs(dist_x) > np.abs(dist_y)
+        voraz_x = np.where(por_x, np.sign(dist_x), 0)
+        voraz_y = np.where(por_x, 0, np.where(dist_y > 0, 1, -1))
+
+        # Una sola BFS desde el jugador, acotada a la visión máxima más un margen.
+        # Se detiene al llegar a todos los enemigos: los vecinos que mejoran
+        # (distancia menor que la del enemigo) ya tienen su valor a esa altura
+        dist, i0, j0 = mapa.flujo_hacia(jugador.x, jugador.y, int(self.vision[ids].max()) + ENEMY_FLOW_MARGIN,
+                                        zip(ex.tolist(), ey.tolist()))
+        alto, ancho = dist.shape
+        propia = dist[ex - i0, ey - j0]
+        vx = ex[:, None] + PASOS_X - i0
+        vy = ey[:, None] + PASOS_Y - j0
+        dentro = (vx >= 0) & (vx < alto) & (vy >= 0) & (vy < ancho)
+        d = np.full(vx.shape, -1, dtype=np.int32)
+        d[dentro] = dist[vx[dentro], vy[dentro]]
+        mejora = (d >= 0) & (d < propia[:, None])
+        es_voraz = (PASOS_X == voraz_x[:, None]) & (PASOS_Y == voraz_y[:, None])
+        puntos = np.where(mejora, 2 * d + ~es_voraz, np.iinfo(np.int32).max)
+        k = puntos.argmin(axis=1)
+        dx = np.where(propia < 0, voraz_x, PASOS_X[k])
+        dy = np.where(propia < 0, voraz_y, PASOS_Y[k])
+        # propia == 0: el enemigo ya está sobre el jugador y no se mueve
+        ok = np.where(propia < 0, mapa.transitables(ex + dx, ey + dy), mejora.any(axis=1))
+        ids, nx, ny = ids[ok], (ex + dx)[ok], (ey + dy)[ok]
+        for i in ids.tolist():
+            self._desindexar_enemigo(i)
+        self.ex[ids] = nx
+        self.ey[ids] = ny
+        for i in ids.tolist():
+            self._indexar_enemigo(i)
+        self.edx[ids] = dx[ok]
+        self.edy[ids] = dy[ok]
+        self.ultimo_mov[ids] = turno
+        return ids
@@ -0,0 +1,86 @@
+# Benchmark de entidades: bytes por entidad y velocidad de construcción
+#
+# Uso (desde la carpeta del juego):
+#   python benchmarks/bench_entidades.py [--n 10000 50000] [--mapas 8]
+# Mide el almacén en arrays (AlmacenEntidades, con su índice espacial), las
+# vistas Enemigo/Cofre y Personaje con __slots__, y cuánta memoria ocupan
+# varios mapas con sus entidades a la vez en el mismo proceso.
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from almacen_entidades import AlmacenEntidades
+from entidades import Personaje, sortear_cofres
+
+
+def construir(n, rng):
+    """Almacén con n enemigos y n cofres en celdas distintas de un mapa de ~4n celdas."""
+    lado = int(np.ceil(np.sqrt(4 * n)))
+    celdas = rng.choice(lado * lado, 2 * n, replace=False)
+    xs, ys = np.divmod(celdas, lado)
+    almacen = AlmacenEntidades()
+    almacen.agregar_enemigos(xs[:n], ys[:n], 5)
+    almacen.agregar_cofres(xs[n:], ys[n:], *sortear_cofres(rng, n))
+    return almacen
+
+
+def bytes_arrays(almacen):
+    """Bytes de las columnas numpy (sin el índice espacial), contando solo las filas usadas."""
+    campos = [(nombre, almacen.n_enemigos) for nombre, _ in almacen.CAMPOS_ENEMIGO]
+    campos += [(nombre, almacen.n_cofres) for nombre, _ in almacen.CAMPOS_COFRE]
+    return sum(getattr(almacen, nombre)[:usados].nbytes for nombre, usados in campos)
+
+
+def medir_memoria(fabrica):
+    """(resultado, bytes reservados) de llamar a fabrica()."""
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    resultado = fabrica()
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return resultado, despues - antes
+
+
+def medir_tiempo(fabrica, repeticiones=3):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        fabrica()
+        mejor = min(mejor, time.perf_counter() - t)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria y velocidad de las entidades")
+    parser.add_argument('--n', type=int, nargs='+', default=[10_000, 50_000],
+                        help='enemigos (y cofres) por mapa')
+    parser.add_argument('--mapas', type=int, default=8, help='mapas simultáneos a medir')
+    args = parser.parse_args()
+
+    # B/entidad: todo el almacén (arrays con su capacidad sobrante + índice espacial)
+    # B/arrays: solo los datos de las columnas; B/vista: una vista Enemigo/Cofre
+    print(f'{"entidades":>10} {"B/entidad":>10} {"B/arrays":>9} {"B/vista":>8} {"ent/s":>12} '
+          f'{"mapas":>6} {"MB total":>9}')
+    for n in args.n:
+        total = 2 * n
+        almacen, bytes_almacen = medir_memoria(lambda: construir(n, np.random.default_rng(0)))
+        _, bytes_vistas = medir_memoria(lambda: (almacen.enemigos(), almacen.cofres()))
+        segundos = medir_tiempo(lambda: construir(n, np.random.default_rng(0)))
+        _, bytes_mapas = medir_memoria(
+            lambda: [construir(n, np.random.default_rng(k)) for k in range(args.mapas)])
+        print(f'{total:>10} {bytes_almacen / total:>10.1f} {bytes_arrays(almacen) / total:>9.1f} '
+              f'{bytes_vistas / total:>8.1f} '
+              f'{total / segundos:>12,.0f} {args.mapas:>6} {bytes_mapas / 2**20:>9.1f}')
+
+    _, bytes_personajes = medir_memoria(lambda: [Personaje(i, i) for i in range(10_000)])
+    print(f'Personaje (__slots__): {bytes_personajes / 10_000:.1f} B/instancia')
+
+
+if __name__ == '__main__':
+    main()
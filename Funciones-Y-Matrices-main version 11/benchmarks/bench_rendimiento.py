@@ -0,0 +1,210 @@
+# Benchmarks de los caminos calientes: generación, IA, revelado y dibujado
+#
+# Uso (desde la carpeta del juego; no necesita pantalla ni audio):
+#   python benchmarks/bench_rendimiento.py --salida base.json
+#   python benchmarks/bench_rendimiento.py --comparar base.json [--umbral 0.10]
+#   python benchmarks/bench_rendimiento.py --rapido        (menos tamaños y repeticiones)
+# Cada resultado guarda la mediana, el mínimo y el p90 en milisegundos. Con
+# --comparar se muestra el cociente actual / base de cada medida y el proceso
+# termina con código 1 si alguna mediana empeora más que --umbral.
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+# Sin ventana ni audio reales: drivers "dummy" de SDL antes de importar pygame
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+CARPETA_JUEGO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CARPETA_JUEGO)
+
+import numpy as np
+import pygame
+
+from config import VISIBLE_RADIUS
+from mapa import Mapa
+from simulacion import Simulacion, ACCIONES
+
+TAMANOS = (15, 25, 50, 100, 200, 300, 500)
+TAMANOS_RAPIDO = (15, 50, 200)
+ENEMIGOS = (10, 100, 1000, 10000)
+ENEMIGOS_RAPIDO = (10, 1000)
+
+
+def medir(funcion, repeticiones, preparar=None):
+    """Tiempos en ms de `repeticiones` llamadas (preparar() no se cronometra)."""
+    tiempos = []
+    for _ in range(repeticiones):
+        argumento = preparar() if preparar is not None else None
+        t = time.perf_counter()
+        funcion(argumento) if preparar is not None else funcion()
+        tiempos.append((time.perf_counter() - t) * 1000)
+    return tiempos
+
+
+def resumen(tiempos):
+    ordenados = sorted(tiempos)
+    return {
+        'mediana_ms': statistics.median(ordenados),
+        'min_ms': ordenados[0],
+        'p90_ms': ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.9))],
+        'n': len(ordenados),
+    }
+
+
+# --- Generación de niveles ---
+def bench_generacion(tamanos, rapido):
+    resultados = {}
+    for n in tamanos:
+        repeticiones = 3 if n >= 300 or rapido else 10
+        semillas = iter(range(1000))
+        resultados[f'generar_mapa/{n}x{n}'] = resumen(medir(
+            lambda mapa: mapa.generar_mapa(), repeticiones,
+            preparar=lambda: Mapa(n, n, next(semillas))))
+        mapa = Mapa(n, n, 0)
+        mapa.generar_mapa()
+        centro = (n // 2, n // 2)
+        resultados[f'alcanzables_desde/{n}x{n}'] = resumen(medir(
+            lambda: mapa._alcanzables_desde(centro), repeticiones * 3))
+        celdas = np.argwhere(mapa.base_matriz > 0)
+        rng = random.Random(0)
+
+        def revelar(celda):
+            mapa.revelar_area(int(celda[0]), int(celda[1]), VISIBLE_RADIUS)
+        resultados[f'revelar_area/{n}x{n}'] = resumen(medir(
+            revelar, 200, preparar=lambda: celdas[rng.randrange(len(celdas))]))
+    return resultados
+
+
+# --- Coste por turno según el número de enemigos ---
+def proveedor_con_enemigos(numero):
+    """Proveedor de mapas (100x100) con `numero` enemigos extra sobre suelo alcanzable."""
+    def proveedor(filas, columnas, seed):
+        mapa = Mapa(100, 100, seed)
+        mapa.generar_mapa()
+        alcanzables, _ = mapa._alcanzables_desde((mapa.jugador.x, mapa.jugador.y))
+        celdas = mapa.rng.choice(alcanzables, numero, replace=len(alcanzables) < numero)
+        xs, ys = np.divmod(celdas, mapa.columnas)
+        mapa.entidades.agregar_enemigos(xs, ys, 10)
+        return mapa
+    return proveedor
+
+
+def bench_turnos(cantidades, rapido):
+    resultados = {}
+    pasos = 100 if rapido else 300
+    for numero in cantidades:
+        sim = Simulacion(semilla=0, proveedor_mapas=proveedor_con_enemigos(numero))
+        sim.nuevo_juego()
+        rng = random.Random(0)
+        acciones = list(ACCIONES)
+
+        def turno(accion):
+            j = sim.mapa.jugador
+            # Sin derrotas ni fin de partida: solo se mide el coste del turno
+            j.corazones_llenos = j.corazones_totales = 99
+            j.espadas = 0
+            j.armaduras = 99
+            sim.step(accion)
+        resultados[f'turno/{numero}_enemigos'] = resumen(medir(
+            turno, pasos, preparar=lambda: rng.choice(acciones)))
+    return resultados
+
+
+# --- Dibujado ---
+def bench_dibujado(rapido):
+    from juego import Juego
+    from simulacion import generar_nivel
+    juego = Juego()
+    juego.iniciar_pygame()
+    juego.esperar_assets_juego()
+    juego.sim = Simulacion(semilla=0, proveedor_mapas=generar_nivel)
+    juego.aplicar_eventos(juego.sim.nuevo_juego())
+    juego.estado = 'jugando'
+    rng = random.Random(0)
+    acciones = list(ACCIONES)
+    marcos = 60 if rapido else 200
+    fases = {'dibujar': juego.dibujar, 'dibujar_minimapa': juego.dibujar_minimapa, 'dibujar_hud': juego.dibujar_hud}
+    tiempos = {nombre: [] for nombre in fases}
+    for _ in range(marcos):
+        # Como en el juego: se redibuja tras cada turno
+        j = juego.sim.mapa.jugador
+        j.corazones_llenos = j.corazones_totales = 99
+        juego.aplicar_eventos(juego.sim.step(rng.choice(acciones)))
+        for nombre, fase in fases.items():
+            tiempos[nombre] += medir(fase, 1)
+    juego.pregenerador.cerrar()
+    juego.cargador.cerrar()
+    pygame.quit()
+    return {f'frame/{nombre}': resumen(t) for nombre, t in tiempos.items()}
+
+
+def comparar(actual, base, umbral):
+    """Imprime actual / base por medida; devuelve las medidas que empeoraron más que umbral."""
+    peores = []
+    print(f'{"medida":<34} {"base ms":>10} {"actual ms":>10} {"cociente":>9}')
+    for nombre, datos in actual['resultados'].items():
+        previo = base.get('resultados', {}).get(nombre)
+        if previo is None:
+            print(f'{nombre:<34} {"-":>10} {datos["mediana_ms"]:>10.3f} {"nuevo":>9}')
+            continue
+        cociente = datos['mediana_ms'] / previo['mediana_ms'] if previo['mediana_ms'] > 0 else float('inf')
+        marca = '  <-- peor' if cociente > 1 + umbral else ''
+        print(f'{nombre:<34} {previo["mediana_ms"]:>10.3f} {datos["mediana_ms"]:>10.3f} {cociente:>9.2f}{marca}')
+        if marca:
+            peores.append(nombre)
+    return peores
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de generación, IA, revelado y dibujado')
+    parser.add_argument('--salida', help='fichero JSON donde guardar los resultados')
+    parser.add_argument('--comparar', help='JSON de referencia con el que comparar')
+    parser.add_argument('--umbral', type=float, default=0.10,
+                        help='empeoramiento relativo tolerado en --comparar (0.10 = 10%%)')
+    parser.add_argument('--rapido', action='store_true', help='menos tamaños y repeticiones')
+    parser.add_argument('--solo', choices=('generacion', 'turnos', 'dibujado'), nargs='+',
+                        help='ejecutar solo estos grupos')
+    args = parser.parse_args()
+    os.chdir(CARPETA_JUEGO)
+
+    grupos = args.solo or ('generacion', 'turnos', 'dibujado')
+    resultados = {}
+    if 'generacion' in grupos:
+        resultados.update(bench_generacion(TAMANOS_RAPIDO if args.rapido else TAMANOS, args.rapido))
+    if 'turnos' in grupos:
+        resultados.update(bench_turnos(ENEMIGOS_RAPIDO if args.rapido else ENEMIGOS, args.rapido))
+    if 'dibujado' in grupos:
+        resultados.update(bench_dibujado(args.rapido))
+    salida = {
+        'meta': {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pygame': pygame.version.ver,
+            'plataforma': platform.platform(),
+            'rapido': args.rapido,
+        },
+        'resultados': resultados,
+    }
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(salida, f, indent=2, ensure_ascii=False)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        if comparar(salida, base, args.umbral):
+            sys.exit(1)
+    elif not args.salida:
+        json.dump(salida, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+
+
+if __name__ == '__main__':
+    main()
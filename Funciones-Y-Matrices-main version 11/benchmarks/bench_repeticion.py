@@ -0,0 +1,90 @@
+# Repite partidas grabadas (cache/repeticiones/*.repl) sin pantalla y a toda velocidad
+#
+# Uso (desde la carpeta del juego):
+#   python benchmarks/bench_repeticion.py cache/repeticiones/partida_....repl
+#   python benchmarks/bench_repeticion.py partida.repl --tiempos [--lentos 10]
+#   python benchmarks/bench_repeticion.py partida.repl --salida base.json
+#   python benchmarks/bench_repeticion.py partida.repl --comparar base.json
+# Comprueba el hash del estado en cada turno y termina con código 1 si la
+# partida diverge de la grabación. Con --tiempos (implícito en --salida y
+# --comparar) cronometra cada turno y muestra los más lentos; el JSON tiene el
+# mismo formato que bench_rendimiento.py, así que una partida real sirve como
+# carga de trabajo para detectar regresiones.
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+CARPETA_JUEGO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CARPETA_JUEGO)
+
+import numpy as np
+
+from bench_rendimiento import resumen, comparar
+from repeticion import Repeticion, reproducir
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Repetición sin pantalla de partidas grabadas')
+    parser.add_argument('grabaciones', nargs='+', help='ficheros .repl')
+    parser.add_argument('--tiempos', action='store_true', help='cronometrar cada turno')
+    parser.add_argument('--lentos', type=int, default=10, help='turnos más lentos a mostrar')
+    parser.add_argument('--salida', help='fichero JSON donde guardar los resultados')
+    parser.add_argument('--comparar', help='JSON de referencia con el que comparar')
+    parser.add_argument('--umbral', type=float, default=0.10,
+                        help='empeoramiento relativo tolerado en --comparar (0.10 = 10%%)')
+    args = parser.parse_args()
+    cronometrar = args.tiempos or bool(args.salida or args.comparar)
+
+    resultados = {}
+    divergentes = []
+    for ruta in args.grabaciones:
+        repeticion = Repeticion.cargar(ruta)
+        nombre = os.path.splitext(os.path.basename(ruta))[0]
+        t = time.perf_counter()
+        r = reproducir(repeticion, cronometrar=cronometrar)
+        total = time.perf_counter() - t
+        niveles = max(r['niveles'], default=1)
+        print(f'{nombre}: {r["turnos"]}/{len(repeticion)} turnos, nivel {niveles}, '
+              f'{total:.2f} s ({r["turnos"] / total if total else 0:.0f} turnos/s)')
+        if r['divergencia'] is not None:
+            print(f'  DIVERGE en el turno {r["divergencia"]}')
+            divergentes.append(nombre)
+        if not cronometrar or not r['tiempos_ms']:
+            continue
+        tiempos = r['tiempos_ms']
+        datos = resumen(tiempos)
+        resultados[f'repeticion/{nombre}/turno'] = datos
+        print(f'  turno: mediana {datos["mediana_ms"]:.3f} ms, p90 {datos["p90_ms"]:.3f} ms, '
+              f'máx {max(tiempos):.3f} ms')
+        lentos = np.argsort(tiempos)[::-1][:args.lentos]
+        for k in lentos.tolist():
+            print(f'    turno {k + 1:>6} (nivel {r["niveles"][k]:>3}, {repeticion.acciones[k]:<9}) {tiempos[k]:8.3f} ms')
+
+    if args.salida or args.comparar:
+        salida = {
+            'meta': {
+                'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'plataforma': platform.platform(),
+                'grabaciones': args.grabaciones,
+            },
+            'resultados': resultados,
+        }
+        if args.salida:
+            with open(args.salida, 'w', encoding='utf-8') as f:
+                json.dump(salida, f, indent=2, ensure_ascii=False)
+        if args.comparar:
+            with open(args.comparar, encoding='utf-8') as f:
+                base = json.load(f)
+            if comparar(salida, base, args.umbral):
+                sys.exit(1)
+    if divergentes:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# Caché en disco de imágenes ya escaladas
+#
+# Decodificar un PNG y pasarle smoothscale cuesta mucho más que leer sus
+# píxeles finales. La primera vez se hace el trabajo completo y se guardan los
+# píxeles resultantes (RGB o RGBA, sin comprimir: leerlos es lo más rápido) en un fichero
+# cuyo nombre sale del hash del PNG de origen y del tamaño pedido; en los
+# siguientes arranques cargar la imagen es leer ese buffer en una Surface.
+# Si el PNG cambia, cambia su hash y se genera otra entrada. Las entradas
+# viejas se borran por antigüedad de uso (mtime) al pasar de max_bytes, como
+# en cache_niveles.py.
+import hashlib
+import os
+import struct
+from pathlib import Path
+import pygame
+
+MAGIA = b'ASST'
+FORMATO = 1
+CABECERA = struct.Struct('<4sHHII')  # magia, formato, bytes por píxel, ancho, alto
+EXTENSION = '.px'
+
+# pygame < 2.1.3 solo tiene los nombres antiguos
+_desde_bytes = getattr(pygame.image, 'frombytes', None) or pygame.image.fromstring
+_a_bytes = getattr(pygame.image, 'tobytes', None) or pygame.image.tostring
+
+
+def _hash_fichero(ruta):
+    with open(ruta, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def tamano_ajustado(ancho, alto, caja_ancho, caja_alto):
+    """Tamaño que cabe en la caja sin deformar la imagen (letterbox)."""
+    escala = min(caja_ancho / ancho, caja_alto / alto)
+    return int(ancho * escala), int(alto * escala)
+
+
+class CacheAssets:
+    def __init__(self, directorio, max_bytes=64 * 1024 * 1024):
+        self.directorio = Path(directorio) if directorio else None
+        self.max_bytes = max_bytes
+
+    def _ruta(self, origen, ancho, alto, alpha, ajustar):
+        modo = 'fit' if ajustar else 'px'
+        canal = 'rgba' if alpha else 'rgb'
+        return self.directorio / f'{_hash_fichero(origen)}_{ancho}x{alto}_{modo}_{canal}{EXTENSION}'
+
+    def pixeles(self, origen, ancho, alto, alpha=True, ajustar=False):
+        """Surface de `origen` escalada a ancho x alto (o ajustada a esa caja si ajustar).
+
+        No toca la pantalla, así que puede llamarse desde otro hilo; la
+        conversión (convert / convert_alpha) se hace luego en el principal.
+        Lanza la excepción de pygame si el PNG no se puede leer, igual que
+        pygame.image.load.
+        """
+        ruta = None
+        if self.directorio is not None:
+            try:
+                ruta = self._ruta(origen, ancho, alto, alpha, ajustar)
+                superficie = self._leer(ruta, alpha)
+                if superficie is not None:
+                    return superficie
+            except OSError:
+                ruta = None
+        img = pygame.image.load(origen)
+        # A RGB/RGBA plano (smoothscale no admite paletas) sin depender de la
+        # pantalla; en RGB el canal alfa se descarta, como hace convert()
+        modo = 'RGBA' if alpha else 'RGB'
+        base = _desde_bytes(_a_bytes(img, modo), img.get_size(), modo)
+        if ajustar:
+            ancho, alto = tamano_ajustado(base.get_width(), base.get_height(), ancho, alto)
+        superficie = pygame.transform.smoothscale(base, (ancho, alto))
+        if ruta is not None:
+            self._escribir(ruta, superficie, alpha)
+        return superficie
+
+    def _leer(self, ruta, alpha):
+        try:
+            with open(ruta, 'rb') as f:
+                magia, formato, bpp, ancho, alto = CABECERA.unpack(f.read(CABECERA.size))
+                if magia != MAGIA or formato != FORMATO or bpp != (4 if alpha else 3):
+                    return None
+                datos = f.read()
+        except (OSError, struct.error):
+            return None
+        if len(datos) != ancho * alto * bpp:
+            return None
+        # Marca de uso para la expulsión LRU
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        return _desde_bytes(datos, (ancho, alto), 'RGBA' if alpha else 'RGB')
+
+    def _escribir(self, ruta, superficie, alpha):
+        """Guarda los píxeles de forma atómica; si falla, simplemente no hay caché."""
+        modo = 'RGBA' if alpha else 'RGB'
+        ancho, alto = superficie.get_size()
+        temporal = ruta.with_name(ruta.name + f'.{os.getpid()}.tmp')
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            with open(temporal, 'wb') as f:
+                f.write(CABECERA.pack(MAGIA, FORMATO, len(modo), ancho, alto))
+                f.write(_a_bytes(superficie, modo))
+            os.replace(temporal, ruta)
+        except OSError:
+            try:
+                temporal.unlink()
+            except OSError:
+                pass
+            return
+        self.expulsar()
+
+    def expulsar(self):
+        """Borra los ficheros usados hace más tiempo hasta quedar bajo max_bytes."""
+        try:
+            ficheros = [(p.stat(), p) for p in self.directorio.glob('*' + EXTENSION)]
+        except OSError:
+            return
+        total = sum(st.st_size for st, _ in ficheros)
+        for st, p in sorted(ficheros, key=lambda fp: fp[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+                total -= st.st_size
+            except OSError:
+                pass
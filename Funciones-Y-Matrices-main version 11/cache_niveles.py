@@ -0,0 +1,133 @@
+# Caché en disco de niveles generados, indexada por (filas, columnas, seed, versión)
+#
+# Formato de cada fichero (little endian):
+#   cabecera  CABECERA (magia, formato, versión del generador, tamaño, semilla,
+#             jugador, portal y número de enemigos/cofres)
+#   matriz    filas * columnas bytes con los códigos de celdas.py
+#   enemigos  registros REGISTRO_ENEMIGO
+#   cofres    registros REGISTRO_COFRE
+# La matriz y los registros se leen con np.memmap: cargar un nivel es mapear
+# el fichero, no regenerarlo.
+import os
+import struct
+from pathlib import Path
+import numpy as np
+
+from mapa import Mapa, VERSION_GENERADOR
+from entidades import CONTENIDOS
+
+MAGIA = b'NIVL'
+FORMATO = 1
+CABECERA = struct.Struct('<4sHHIIIQiiiiII')
+REGISTRO_ENEMIGO = np.dtype([('x', '<i4'), ('y', '<i4'), ('vision', '<i2')])
+REGISTRO_COFRE = np.dtype([('x', '<i4'), ('y', '<i4'), ('contenido', 'u1'), ('valor', '<i4')])
+EXTENSION = '.nivel'
+
+
+class CacheNiveles:
+    """Guarda y carga niveles deterministas; expulsa los menos usados al pasar de max_bytes."""
+
+    def __init__(self, directorio, max_bytes=64 * 1024 * 1024):
+        self.directorio = Path(directorio)
+        self.max_bytes = max_bytes
+
+    def ruta(self, filas, columnas, seed):
+        return self.directorio / f'{filas}x{columnas}_{seed}_v{VERSION_GENERADOR}{EXTENSION}'
+
+    def contiene(self, filas, columnas, seed):
+        return seed is not None and self.ruta(filas, columnas, seed).exists()
+
+    def cargar(self, filas, columnas, seed):
+        """Mapa guardado para esa clave, o None si no está (o el fichero no es válido)."""
+        if seed is None:
+            return None
+        ruta = self.ruta(filas, columnas, seed)
+        try:
+            with open(ruta, 'rb') as f:
+                cabecera = CABECERA.unpack(f.read(CABECERA.size))
+            (magia, formato, version, _, f_filas, f_columnas, f_seed,
+             jx, jy, px, py, n_enemigos, n_cofres) = cabecera
+            if (magia != MAGIA or formato != FORMATO or version != VERSION_GENERADOR
+                    or (f_filas, f_columnas, f_seed) != (filas, columnas, seed)):
+                return None
+            offset = CABECERA.size
+            # 'c' = copia en escritura: el mapa nunca modifica el fichero
+            base = np.memmap(ruta, dtype=np.uint8, mode='c', offset=offset, shape=(filas, columnas))
+            offset += filas * columnas
+            enemigos = np.memmap(ruta, dtype=REGISTRO_ENEMIGO, mode='r', offset=offset, shape=(n_enemigos,)) \
+                if n_enemigos else np.empty(0, REGISTRO_ENEMIGO)
+            offset += n_enemigos * REGISTRO_ENEMIGO.itemsize
+            cofres = np.memmap(ruta, dtype=REGISTRO_COFRE, mode='r', offset=offset, shape=(n_cofres,)) \
+                if n_cofres else np.empty(0, REGISTRO_COFRE)
+        except (OSError, ValueError, struct.error):
+            return None
+        paquete = {
+            'filas': filas,
+            'columnas': columnas,
+            'seed': seed,
+            'jugador': (jx, jy),
+            'portal': (px, py),
+            'enemigos': enemigos.tolist(),
+            'cofres': [(x, y, CONTENIDOS[c], v) for x, y, c, v in cofres.tolist()],
+        }
+        # Marca de uso para la expulsión LRU
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        return Mapa.desde_paquete(paquete, base)
+
+    def guardar(self, mapa):
+        """Escribe el nivel (de forma atómica) y aplica el límite de tamaño."""
+        if mapa.seed is None or not 0 <= mapa.seed < 2**64:
+            return
+        paquete = mapa.empaquetar()
+        enemigos = np.array(paquete['enemigos'], dtype=REGISTRO_ENEMIGO)
+        cofres = np.array([(x, y, CONTENIDOS.index(c), v) for x, y, c, v in paquete['cofres']],
+                          dtype=REGISTRO_COFRE)
+        jx, jy = paquete['jugador']
+        px, py = paquete['portal']
+        cabecera = CABECERA.pack(MAGIA, FORMATO, VERSION_GENERADOR, 0, mapa.filas, mapa.columnas,
+                                 mapa.seed, jx, jy, px, py, len(enemigos), len(cofres))
+        ruta = self.ruta(mapa.filas, mapa.columnas, mapa.seed)
+        temporal = ruta.with_name(ruta.name + f'.{os.getpid()}.tmp')
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            with open(temporal, 'wb') as f:
+                f.write(cabecera)
+                f.write(np.ascontiguousarray(mapa.base_matriz, dtype=np.uint8).tobytes())
+                f.write(enemigos.tobytes())
+                f.write(cofres.tobytes())
+            os.replace(temporal, ruta)
+        except OSError:
+            try:
+                temporal.unlink()
+            except OSError:
+                pass
+            return
+        self.expulsar()
+
+    def mapa(self, filas, columnas, seed):
+        """Carga el nivel de la caché o lo genera y lo guarda."""
+        mapa = self.cargar(filas, columnas, seed)
+        if mapa is None:
+            mapa = Mapa(filas, columnas, seed)
+            mapa.generar_mapa()
+            self.guardar(mapa)
+        return mapa
+
+    def expulsar(self):
+        """Borra los ficheros usados hace más tiempo hasta quedar bajo max_bytes."""
+        try:
+            ficheros = [(p.stat(), p) for p in self.directorio.glob('*' + EXTENSION)]
+        except OSError:
+            return
+        total = sum(st.st_size for st, _ in ficheros)
+        for st, p in sorted(ficheros, key=lambda fp: fp[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+                total -= st.st_size
+            except OSError:
+                pass
@@ -0,0 +1,25 @@
+# Caché LRU de textos renderizados
+#
+# font.render rasteriza el texto cada vez; el HUD repite casi siempre las
+# mismas cadenas, así que se guarda la Surface por (fuente, texto, color,
+# antialias) y se reutiliza. Las menos usadas se descartan al pasar del límite.
+from collections import OrderedDict
+
+
+class CacheTextos:
+    def __init__(self, max_textos=128):
+        self.max_textos = max(1, max_textos)
+        self._textos = OrderedDict()
+
+    def render(self, font, texto, color, antialias=True):
+        """Como font.render(texto, antialias, color), pero reutilizando la Surface."""
+        clave = (font, texto, tuple(color), antialias)
+        superficie = self._textos.get(clave)
+        if superficie is not None:
+            self._textos.move_to_end(clave)
+            return superficie
+        superficie = font.render(texto, antialias, color)
+        self._textos[clave] = superficie
+        if len(self._textos) > self.max_textos:
+            self._textos.popitem(last=False)
+        return superficie
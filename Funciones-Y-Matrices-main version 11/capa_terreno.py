@@ -0,0 +1,98 @@
+# Capa de terreno pre-renderizada por bloques de tiles
+#
+# El terreno no cambia tras generarse y lo revelado solo cambia al moverse, así
+# que no hace falta volver a dibujar cada tile en cada frame. El mapa se trocea
+# en bloques de RENDER_CHUNK_TILES x RENDER_CHUNK_TILES tiles; cada bloque es
+# una Surface que se dibuja entera la primera vez que aparece en pantalla y
+# después solo recibe los tiles que revelar_area va descubriendo. El frame
+# queda en unos pocos blits de bloque más los sprites.
+#
+# En memoria se guardan los bloques que caben en la vista más un margen
+# (RENDER_CHUNK_MARGIN) para no redibujar al ir y volver; con bloques de 4
+# tiles de 100 px son ~28 Surfaces de 400x400 (unos 18 MB).
+from collections import OrderedDict
+import math
+import pygame
+
+from config import BLACK
+from celdas import SUELO, PORTAL
+
+
+def bloques_visibles(ancho_px, alto_px, lado_px):
+    """Máximo de bloques de `lado_px` que pueden verse a la vez en una vista de ancho_px x alto_px."""
+    return (math.ceil(ancho_px / lado_px) + 1) * (math.ceil(alto_px / lado_px) + 1)
+
+
+class CapaTerreno:
+    def __init__(self, tile_px, tex_floor, tex_wall, tex_portal, ancho_vista, alto_vista,
+                 tiles_bloque=4, margen_bloques=8):
+        self.tile_px = tile_px
+        self.tex_floor = tex_floor
+        self.tex_wall = tex_wall
+        self.tex_portal = tex_portal
+        self.tiles_bloque = tiles_bloque
+        self.max_bloques = bloques_visibles(ancho_vista, alto_vista, tiles_bloque * tile_px) + max(0, margen_bloques)
+        self.mapa = None
+        self._bloques = OrderedDict()  # (bi, bj) -> Surface, en orden de uso
+
+    def reiniciar(self, mapa):
+        """Olvida los bloques dibujados y pasa a pintar `mapa`."""
+        self.mapa = mapa
+        self._bloques.clear()
+
+    def _estampar_tile(self, superficie, celda, x, y):
+        if celda == SUELO:
+            superficie.blit(self.tex_floor, (x, y))
+        elif celda == PORTAL:
+            superficie.blit(self.tex_floor, (x, y))
+            superficie.blit(self.tex_portal, (x, y))
+        else:
+            superficie.blit(self.tex_wall, (x, y))
+
+    def _bloque(self, bi, bj):
+        clave = (bi, bj)
+        superficie = self._bloques.get(clave)
+        if superficie is not None:
+            self._bloques.move_to_end(clave)
+            return superficie
+        t = self.tiles_bloque
+        lado = t * self.tile_px
+        superficie = pygame.Surface((lado, lado)).convert()
+        superficie.fill(BLACK)
+        celdas, revelado = self.mapa.region(bi * t, bi * t + t, bj * t, bj * t + t)
+        for i, (fila_celdas, fila_rev) in enumerate(zip(celdas.tolist(), revelado.tolist())):
+            for j, (celda, visible) in enumerate(zip(fila_celdas, fila_rev)):
+                if visible:
+                    self._estampar_tile(superficie, celda, j * self.tile_px, i * self.tile_px)
+        self._bloques[clave] = superficie
+        while len(self._bloques) > self.max_bloques:
+            self._bloques.popitem(last=False)
+        return superficie
+
+    def estampar(self, xs, ys):
+        """Pinta las celdas recién reveladas en los bloques que ya estén dibujados.
+
+        Los bloques que no están en memoria se dibujarán completos (con estas
+        celdas incluidas) la próxima vez que se vean.
+        """
+        if self.mapa is None or len(xs) == 0:
+            return
+        t = self.tiles_bloque
+        # Una sola lectura del rectángulo que cubre el lote (vale para Mapa y MapaChunks)
+        x0, y0 = int(xs.min()), int(ys.min())
+        celdas, _ = self.mapa.region(x0, int(xs.max()) + 1, y0, int(ys.max()) + 1)
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            superficie = self._bloques.get((x // t, y // t))
+            if superficie is None:
+                continue
+            self._estampar_tile(superficie, celdas.item(x - x0, y - y0), (y % t) * self.tile_px, (x % t) * self.tile_px)
+
+    def dibujar(self, screen, offset_x, offset_y, start_i, end_i, start_j, end_j):
+        """Blit de los bloques que cubren las filas [start_i, end_i) y columnas [start_j, end_j)."""
+        if end_i <= start_i or end_j <= start_j:
+            return
+        t = self.tiles_bloque
+        lado = t * self.tile_px
+        for bi in range(start_i // t, (end_i - 1) // t + 1):
+            for bj in range(start_j // t, (end_j - 1) // t + 1):
+                screen.blit(self._bloque(bi, bj), (bj * lado + offset_x, bi * lado + offset_y))
@@ -0,0 +1,52 @@
+# Carga de assets en segundo plano (hilos)
+#
+# Decodificar PNG/WAV y leer ficheros se hace en un ThreadPoolExecutor; el hilo
+# principal recoge los resultados con recoger() entre frames y ahí ejecuta el
+# callback de cada asset (convertir la Surface al formato de la pantalla,
+# guardarla en Juego...), porque pygame solo debe tocar la pantalla desde el
+# hilo principal.
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CargadorAssets:
+    def __init__(self, hilos=4):
+        self._executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='assets')
+        self._pendientes = {}   # nombre -> (futuro, al_terminar)
+        self._pedidos = set()
+        self.total = 0
+        self.hechos = 0
+
+    def pedir(self, nombre, funcion, *args, al_terminar=None):
+        """Encola funcion(*args); al_terminar(resultado) se llama en recoger().
+
+        Si la función lanza una excepción, al_terminar recibe None. Pedir dos
+        veces el mismo nombre no hace nada.
+        """
+        if nombre in self._pedidos:
+            return
+        self._pedidos.add(nombre)
+        self._pendientes[nombre] = (self._executor.submit(funcion, *args), al_terminar)
+        self.total += 1
+
+    def recoger(self):
+        """Aplica los callbacks de las cargas terminadas; devuelve cuántas había."""
+        listos = [nombre for nombre, (futuro, _) in self._pendientes.items() if futuro.done()]
+        for nombre in listos:
+            futuro, al_terminar = self._pendientes.pop(nombre)
+            resultado = None if futuro.exception() is not None else futuro.result()
+            self.hechos += 1
+            if al_terminar is not None:
+                al_terminar(resultado)
+        return len(listos)
+
+    def pendiente(self, *nombres):
+        """True si alguno de los nombres (o cualquiera, sin nombres) aún no se recogió."""
+        if not nombres:
+            return bool(self._pendientes)
+        return any(nombre in self._pendientes for nombre in nombres)
+
+    def progreso(self):
+        return self.hechos / self.total if self.total else 1.0
+
+    def cerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,9 @@
+# Códigos de celda del mapa (uint8) y tablas de consulta
+import numpy as np
+
+MURO = 0
+SUELO = 1
+PORTAL = 2
+
+# TRANSITABLE[codigo] -> True si el jugador/enemigos pueden pisar la celda
+TRANSITABLE = np.array([False, True, True], dtype=bool)
@@ -1,7 +1,5 @@
 # Constantes y configuración global (con rutas absolutas de assets)
-import pygame
-pygame.init()
-
+# Sin pygame: la simulación (simulacion.py) importa este módulo sin pantalla ni audio
 from pathlib import Path
 
 # === BASE_DIR absoluto: carpeta que contiene este config.py ===
@@ -31,6 +29,8 @@ PURPLE = (128, 0, 128)
 
 # --- Gameplay ---
 ENEMY_DAMAGE = 25
+ENEMY_SPAWN_MIN_DIST = 0   # distancia BFS mínima jugador-enemigo al generar (0 = sin límite)
+ENEMY_FLOW_MARGIN = 6      # celdas extra (sobre la visión) del campo de persecución alrededor del jugador
 MONEY_MIN = 10
 MONEY_MAX = 50
 
@@ -45,6 +45,27 @@ SCORE_ENEMY = 100
 SCORE_LEVEL = 500
 SCORE_LEVEL_BONUS_PER_LEVEL = 50
 
+# --- Caché de niveles generados (en disco) ---
+LEVEL_CACHE_DIR = asset_path('cache', 'niveles')
+LEVEL_CACHE_MAX_MB = 64
+# Imágenes ya escaladas (None = desactivada)
+ASSET_CACHE_DIR = asset_path('cache', 'assets')
+ASSET_CACHE_MAX_MB = 64
+# Trazas del perfilador (F4 en el juego)
+PROFILE_DIR = asset_path('cache', 'perfiles')
+# Grabaciones de cada partida para repetirlas sin pantalla (None = no grabar)
+REPLAY_DIR = asset_path('cache', 'repeticiones')
+# Partida guardada (F5 guarda, F9 carga); compresión: 'ninguna', 'zlib' o 'lzma'
+SAVE_FILE = asset_path('cache', 'partida.sav')
+SAVE_COMPRESSION = 'zlib'
+# --- Mundos por chunks (niveles muy grandes) ---
+CHUNK_MODE_MIN_CELLS = 512 * 512   # a partir de este área el nivel se genera por chunks
+CHUNK_SIZE = 64                    # celdas por lado de cada chunk
+CHUNK_MAX_LOADED = 64              # chunks en memoria; los más lejanos al jugador van a disco
+
+# Semilla de partida: si no es None, cada partida repite la misma secuencia de niveles
+GAME_SEED = None
+
 # --- Texturas (rutas absolutas) ---
 IMG_PLAYER = asset_path('assets', 'images', 'player.png')
 IMG_ENEMY  = asset_path('assets', 'images', 'enemy.png')
@@ -55,6 +76,8 @@ IMG_WALL   = asset_path('assets', 'images', 'wall.png')
 
 # --- Escala de render ---
 RENDER_SCALE = 1.25
+RENDER_CHUNK_TILES = 4    # tiles por lado de cada bloque pre-renderizado del terreno
+RENDER_CHUNK_MARGIN = 8   # bloques en memoria además de los que caben en pantalla (LRU)
 
 # --- Sonidos (FX) ---
 SND_CHEST  = asset_path('assets', 'sounds', 'chest.wav')
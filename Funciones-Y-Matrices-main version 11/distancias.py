@@ -0,0 +1,141 @@
+# Campo de distancias BFS sobre índices planos de celda (reutilizable)
+import numpy as np
+
+# Hasta este número de celdas la BFS se hace celda a celda en Python: en
+# ventanas pequeñas (el campo de flujo de los enemigos) cuesta menos que las
+# operaciones numpy por nivel, cuyo coste fijo domina cuando cada nivel tiene
+# pocas celdas
+MAX_CELDAS_ESCALAR = 4096
+
+
+class CampoDistancias:
+    """BFS multi-fuente (vecindad 4) sobre una matriz booleana de transitables.
+
+    Trabaja con índices planos (i * columnas + j) y buffers int32 reservados
+    una sola vez: cada llamada a calcular() reutiliza los mismos arrays, así
+    que no se crean tuplas ni diccionarios por celda. Tras calcular():
+      - distancias: matriz int32 (filas, columnas), -1 si no es alcanzable.
+      - alcanzables: índices planos visitados en orden BFS, es decir, con
+        distancia no decreciente.
+    Los dos son vistas de los buffers internos y cambian con la siguiente
+    llamada; copiarlos si hay que conservarlos.
+    """
+
+    def __init__(self, transitable):
+        self.filas = 0
+        self.columnas = 0
+        self._dist = np.empty(0, dtype=np.int32)
+        self._orden = np.empty(0, dtype=np.int32)
+        self._total = 0
+        self.preparar(transitable)
+
+    def preparar(self, transitable):
+        """Cambia la matriz de transitables; solo reserva si crece el tamaño."""
+        transitable = np.asarray(transitable, dtype=bool)
+        self.filas, self.columnas = transitable.shape
+        n = self.filas * self.columnas
+        if self._dist.size < n:
+            self._dist = np.empty(n, dtype=np.int32)
+            self._orden = np.empty(n, dtype=np.int32)
+        self._transitable = np.ascontiguousarray(transitable).ravel()
+        self._transitable_lista = self._transitable.tolist() if n <= MAX_CELDAS_ESCALAR else None
+        self._total = 0
+
+    def indice(self, x, y):
+        return x * self.columnas + y
+
+    def coordenadas(self, indices):
+        """Índices planos -> (filas, columnas) como arrays."""
+        return np.divmod(indices, self.columnas)
+
+    def _planos(self, celdas):
+        c = self.columnas
+        return sorted({x * c + y for x, y in celdas if 0 <= x < self.filas and 0 <= y < c})
+
+    def calcular(self, fuentes, objetivos=None):
+        """BFS desde una o varias celdas (x, y); devuelve la matriz de distancias.
+
+        Con `objetivos` (celdas (x, y)) la búsqueda termina en el nivel en que
+        todos tienen distancia: las celdas más lejanas quedan a -1 aunque sean
+        alcanzables. Sin objetivos (o si alguno es inalcanzable) recorre todo.
+        """
+        if self._transitable_lista is not None:
+            return self._calcular_escalar(fuentes, objetivos)
+        n = self.filas * self.columnas
+        c = self.columnas
+        if objetivos is not None:
+            objetivos = np.array(self._planos(objetivos), dtype=np.int32)
+        dist = self._dist[:n]
+        dist.fill(-1)
+        frente = np.array(self._planos(fuentes), dtype=np.int32)
+        frente = frente[self._transitable[frente]]
+        dist[frente] = 0
+        total = frente.size
+        self._orden[:total] = frente
+        d = 0
+        while frente.size:
+            d += 1
+            col = frente % c
+            vecinos = np.concatenate((
+                frente[col > 0] - 1,
+                frente[col < c - 1] + 1,
+                frente[frente >= c] - c,
+                frente[frente < n - c] + c,
+            ))
+            vecinos = vecinos[self._transitable[vecinos]]
+            vecinos = np.unique(vecinos[dist[vecinos] < 0])
+            dist[vecinos] = d
+            self._orden[total:total + vecinos.size] = vecinos
+            total += vecinos.size
+            frente = vecinos
+            if objetivos is not None and (dist[objetivos] >= 0).all():
+                break
+        self._total = total
+        return self.distancias
+
+    def _calcular_escalar(self, fuentes, objetivos):
+        """Misma BFS con listas de Python; cada nivel se ordena igual que np.unique."""
+        n = self.filas * self.columnas
+        c = self.columnas
+        transitable = self._transitable_lista
+        dist = [-1] * n
+        frente = [i for i in self._planos(fuentes) if transitable[i]]
+        objetivos = None if objetivos is None else self._planos(objetivos)
+        for i in frente:
+            dist[i] = 0
+        orden = list(frente)
+        d = 0
+        while frente:
+            d += 1
+            vecinos = []
+            for i in frente:
+                col = i % c
+                if col > 0 and transitable[i - 1] and dist[i - 1] < 0:
+                    dist[i - 1] = d
+                    vecinos.append(i - 1)
+                if col < c - 1 and transitable[i + 1] and dist[i + 1] < 0:
+                    dist[i + 1] = d
+                    vecinos.append(i + 1)
+                if i >= c and transitable[i - c] and dist[i - c] < 0:
+                    dist[i - c] = d
+                    vecinos.append(i - c)
+                if i < n - c and transitable[i + c] and dist[i + c] < 0:
+                    dist[i + c] = d
+                    vecinos.append(i + c)
+            vecinos.sort()
+            orden.extend(vecinos)
+            frente = vecinos
+            if objetivos is not None and all(dist[i] >= 0 for i in objetivos):
+                break
+        self._dist[:n] = dist
+        self._orden[:len(orden)] = orden
+        self._total = len(orden)
+        return self.distancias
+
+    @property
+    def distancias(self):
+        return self._dist[:self.filas * self.columnas].reshape(self.filas, self.columnas)
+
+    @property
+    def alcanzables(self):
+        return self._orden[:self._total]
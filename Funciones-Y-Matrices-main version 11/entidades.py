@@ -1,12 +1,20 @@
 # Clases: Personaje, Enemigo, Cofre
+# (Enemigo y Cofre son vistas sobre almacen_entidades.AlmacenEntidades)
 
 
-import random
+import numpy as np
 from config import MONEY_MIN, MONEY_MAX
 
+# Contenidos posibles de un cofre (el índice sirve de código compacto)
+CONTENIDOS = ('armadura', 'espada', 'dinero')
+DINERO = CONTENIDOS.index('dinero')
 
 
 class Personaje:
+    # Sin __dict__ por instancia: solo estos atributos
+    __slots__ = ('x', 'y', 'movimientos', 'corazones_totales', 'corazones_llenos',
+                 'armaduras', 'espadas', 'puntuacion')
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -23,15 +31,11 @@ class Personaje:
         # Puntuación acumulada (para recargar corazones)
         self.puntuacion = 0
 
-    def mover(self, dx, dy, base_matriz):
+    def mover(self, dx, dy, mapa):
         """Mueve al jugador si la celda es transitable."""
         nuevo_x = self.x + dx
         nuevo_y = self.y + dy
-        filas = len(base_matriz)
-        columnas = len(base_matriz[0])
-        if not (0 <= nuevo_x < filas and 0 <= nuevo_y < columnas):
-            return False
-        if base_matriz[nuevo_x][nuevo_y] in ('.', 'S'):
+        if mapa.es_transitable(nuevo_x, nuevo_y):
             self.x = nuevo_x
             self.y = nuevo_y
             self.movimientos += 1
@@ -54,49 +58,67 @@ class Personaje:
             self.corazones_llenos += 1
 
 
+def _campo(nombre, tipo=int, escribible=True):
+    """Propiedad que lee (y escribe) la columna `nombre` del almacén en la fila self.id.
+
+    El array se busca en cada acceso porque el almacén lo reemplaza al crecer.
+    Posiciones y apertura de cofres son de solo lectura: se cambian con los
+    métodos del almacén para mantener su índice espacial.
+    """
+    def leer(self):
+        return tipo(getattr(self.almacen, nombre)[self.id])
+
+    def escribir(self, valor):
+        getattr(self.almacen, nombre)[self.id] = valor
+    return property(leer, escribir if escribible else None)
+
+
 class Enemigo:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.vida = 50
-        self.vision = 5
-        self.ultimo_movimiento = 0
-        # Dirección del último paso (para poder empujar en sentido contrario)
-        self.ultimo_dx = 0
-        self.ultimo_dy = 0
-
-    def mover_hacia_jugador(self, jugador, base_matriz, movimiento_actual):
-        # Se mueve cada 2 movimientos del jugador
-        if movimiento_actual - self.ultimo_movimiento < 2:
-            return False
-        dist_x = jugador.x - self.x
-        dist_y = jugador.y - self.y
-        if abs(dist_x) <= self.vision and abs(dist_y) <= self.vision:
-            dx, dy = 0, 0
-            if abs(dist_x) > abs(dist_y):
-                dx = 1 if dist_x > 0 else -1
-            else:
-                dy = 1 if dist_y > 0 else -1
-            nuevo_x = self.x + dx
-            nuevo_y = self.y + dy
-            filas = len(base_matriz)
-            columnas = len(base_matriz[0])
-            if 0 <= nuevo_x < filas and 0 <= nuevo_y < columnas:
-                if base_matriz[nuevo_x][nuevo_y] in ('.', 'S'):
-                    self.x = nuevo_x
-                    self.y = nuevo_y
-                    self.ultimo_movimiento = movimiento_actual
-                    self.ultimo_dx = dx
-                    self.ultimo_dy = dy
-                    return True
-        return False
+    """Vista de un enemigo dentro de un AlmacenEntidades (los datos viven en sus arrays)."""
+    __slots__ = ('almacen', 'id')
+
+    def __init__(self, almacen, id):
+        self.almacen = almacen
+        self.id = id
+
+    x = _campo('ex', escribible=False)
+    y = _campo('ey', escribible=False)
+    vision = _campo('vision')
+    ultimo_movimiento = _campo('ultimo_mov')
+    # Dirección del último paso (para poder empujar en sentido contrario)
+    ultimo_dx = _campo('edx')
+    ultimo_dy = _campo('edy')
+
+    def __eq__(self, otro):
+        return isinstance(otro, Enemigo) and otro.almacen is self.almacen and otro.id == self.id
+
+    def __hash__(self):
+        return hash((id(self.almacen), self.id))
+
 
 class Cofre:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        # Armadura / Espada / Dinero
-        self.contenido = random.choice(['armadura', 'espada', 'dinero'])
-        # Valor solo aplica para dinero
-        self.valor = random.randint(MONEY_MIN, MONEY_MAX) if self.contenido == 'dinero' else 0
-        self.abierto = False
+    """Vista de un cofre dentro de un AlmacenEntidades."""
+    __slots__ = ('almacen', 'id')
+
+    def __init__(self, almacen, id):
+        self.almacen = almacen
+        self.id = id
+
+    x = _campo('cx', escribible=False)
+    y = _campo('cy', escribible=False)
+    # Valor solo aplica para dinero
+    valor = _campo('valor')
+    abierto = _campo('abierto', bool, escribible=False)
+
+    @property
+    def contenido(self):
+        # Armadura / Espada / Dinero (guardado como índice de CONTENIDOS)
+        return CONTENIDOS[self.almacen.contenido[self.id]]
+
+
+def sortear_cofres(rng, n):
+    """(contenidos, valores) de n cofres con el RNG del mapa: códigos de CONTENIDOS y dinero."""
+    contenidos = rng.integers(len(CONTENIDOS), size=n).astype(np.uint8)
+    valores = rng.integers(MONEY_MIN, MONEY_MAX + 1, size=n, dtype=np.int32)
+    valores[contenidos != DINERO] = 0
+    return contenidos, valores
@@ -0,0 +1,287 @@
+# Guardado y carga de la partida en curso (formato binario compacto)
+#
+# Formato del fichero (little endian):
+#   cabecera  CABECERA (magia, formato, versión del generador, compresión y
+#             tamaño del cuerpo sin comprimir)
+#   cuerpo    sin comprimir, zlib o lzma:
+#     partida   PARTIDA (nivel, puntaje, semillas...), la pista del portal en
+#               UTF-8, las semillas de los niveles jugados y el estado del
+#               RNG de la simulación (625 '<u4')
+#     mapa      MAPA (tipo, tamaño, semilla, portal, jugador y contadores)
+#     terreno   Mapa: 4 celdas por byte (2 bits por código de celdas.py)
+#               MapaChunks: nada, los chunks se regeneran con su semilla
+#     revelado  Mapa: 1 bit por celda (np.packbits)
+#               MapaChunks: REGISTRO_CHUNK de cada chunk visitado y sus bits
+#     enemigos  registros REGISTRO_ENEMIGO (también los eliminados: los ids
+#               del almacén se conservan)
+#     cofres    registros REGISTRO_COFRE
+# Sin compresión el cuerpo se lee con np.memmap: cargar un mapa grande es
+# desempaquetar bits, no parsear el fichero.
+#
+# Compatibilidad: cada formato tiene su lector, que produce un dict; los
+# ficheros antiguos se leen con el suyo y pasan por MIGRACIONES hasta el
+# formato actual antes de reconstruir la partida.
+import lzma
+import os
+import struct
+import zlib
+from pathlib import Path
+import numpy as np
+
+from entidades import Personaje
+from mapa import Mapa, VERSION_GENERADOR
+from mapa_chunks import MapaChunks
+from simulacion import Simulacion, generar_nivel
+
+MAGIA = b'PART'
+FORMATO = 1
+CABECERA = struct.Struct('<4sHHBQ')   # magia, formato, versión del generador, compresión, tamaño del cuerpo
+PARTIDA = struct.Struct('<IqQQIH')    # nivel, puntaje, semilla de la partida, semilla siguiente, niveles, len(pista)
+MAPA = struct.Struct('<BIIQIii8iIII')  # tipo, filas, columnas, semilla, tam_chunk, portal, jugador, enemigos, cofres, chunks
+REGISTRO_ENEMIGO = np.dtype([('x', '<i4'), ('y', '<i4'), ('dx', 'i1'), ('dy', 'i1'),
+                             ('vision', '<i2'), ('ultimo_mov', '<i4'), ('vivo', 'u1')])
+REGISTRO_COFRE = np.dtype([('x', '<i4'), ('y', '<i4'), ('contenido', 'u1'), ('valor', '<i4'), ('abierto', 'u1')])
+REGISTRO_CHUNK = np.dtype([('ci', '<i4'), ('cj', '<i4')])
+ESTADO_RNG = 625
+SIN_SEMILLA = 2**64 - 1
+
+COMPRESIONES = {'ninguna': 0, 'zlib': 1, 'lzma': 2}
+_COMPRIMIR = {1: lambda datos: zlib.compress(datos, 6), 2: lzma.compress}
+_DESCOMPRIMIR = {1: zlib.decompress, 2: lzma.decompress}
+
+TIPO_MAPA, TIPO_CHUNKS = 0, 1
+CAMPOS_JUGADOR = Personaje.__slots__
+
+
+# --- Empaquetado de bits ---
+def empaquetar_2bits(celdas):
+    """Códigos 0..3 a 4 por byte (el primero en los bits bajos)."""
+    plano = np.ravel(celdas).astype(np.uint8)
+    plano = np.concatenate((plano, np.zeros(-len(plano) % 4, np.uint8))).reshape(-1, 4)
+    return plano[:, 0] | (plano[:, 1] << 2) | (plano[:, 2] << 4) | (plano[:, 3] << 6)
+
+
+def desempaquetar_2bits(datos, forma):
+    n = forma[0] * forma[1]
+    celdas = (np.asarray(datos, np.uint8)[:, None] >> np.array([0, 2, 4, 6], np.uint8)) & 3
+    return celdas.reshape(-1)[:n].reshape(forma)
+
+
+def _bytes_bits(n):
+    return -(-n // 8)
+
+
+# --- Escritura ---
+def guardar_partida(sim, ruta, compresion='zlib'):
+    """Escribe la partida en curso de `sim` en `ruta` (de forma atómica)."""
+    codigo = COMPRESIONES[compresion]
+    cuerpo = _cuerpo(sim)
+    datos = _COMPRIMIR[codigo](cuerpo) if codigo else cuerpo
+    ruta = Path(ruta)
+    temporal = ruta.with_name(ruta.name + f'.{os.getpid()}.tmp')
+    try:
+        with open(temporal, 'wb') as f:
+            f.write(CABECERA.pack(MAGIA, FORMATO, VERSION_GENERADOR, codigo, len(cuerpo)))
+            f.write(datos)
+        os.replace(temporal, ruta)
+    except OSError:
+        try:
+            temporal.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def _cuerpo(sim):
+    mapa = sim.mapa
+    pista = sim.pista_portal.encode('utf-8')
+    partes = [
+        PARTIDA.pack(sim.nivel, sim.score_total, sim.semilla_partida, sim.semilla_siguiente,
+                     len(sim.semillas_niveles), len(pista)),
+        pista,
+        np.asarray(sim.semillas_niveles, '<u4').tobytes(),
+        np.asarray(sim.rng.getstate()[1], '<u4').tobytes(),
+    ]
+    almacen = mapa.entidades
+    n, m = almacen.n_enemigos, almacen.n_cofres
+    enemigos = np.empty(n, REGISTRO_ENEMIGO)
+    for campo, columna in (('x', 'ex'), ('y', 'ey'), ('dx', 'edx'), ('dy', 'edy'),
+                           ('vision', 'vision'), ('ultimo_mov', 'ultimo_mov'), ('vivo', 'vivo')):
+        enemigos[campo] = getattr(almacen, columna)[:n]
+    cofres = np.empty(m, REGISTRO_COFRE)
+    for campo, columna in (('x', 'cx'), ('y', 'cy'), ('contenido', 'contenido'),
+                           ('valor', 'valor'), ('abierto', 'abierto')):
+        cofres[campo] = getattr(almacen, columna)[:m]
+
+    j = mapa.jugador
+    es_chunks = isinstance(mapa, MapaChunks)
+    chunks = mapa.chunks_poblados() if es_chunks else []
+    semilla = SIN_SEMILLA if mapa.seed is None else mapa.seed
+    partes.append(MAPA.pack(TIPO_CHUNKS if es_chunks else TIPO_MAPA, mapa.filas, mapa.columnas, semilla,
+                            getattr(mapa, 'tam_chunk', 0), *mapa.portal,
+                            *(getattr(j, campo) for campo in CAMPOS_JUGADOR), n, m, len(chunks)))
+    if es_chunks:
+        partes.append(np.array(chunks, REGISTRO_CHUNK).tobytes())
+        partes.extend(np.packbits(mapa.revelado_chunk(ci, cj)).tobytes() for ci, cj in chunks)
+    else:
+        partes.append(empaquetar_2bits(mapa.base_matriz).tobytes())
+        partes.append(np.packbits(mapa.revelado).tobytes())
+    partes.append(enemigos.tobytes())
+    partes.append(cofres.tobytes())
+    return b''.join(partes)
+
+
+# --- Lectura ---
+class _Lector:
+    """Cursor sobre el cuerpo (array uint8: memmap o bytes descomprimidos)."""
+
+    def __init__(self, datos):
+        self.datos = datos
+        self.pos = 0
+
+    def bytes(self, n):
+        parte = self.datos[self.pos:self.pos + n]
+        if len(parte) != n:
+            raise ValueError('partida guardada truncada')
+        self.pos += n
+        return parte
+
+    def struct(self, formato):
+        return formato.unpack(self.bytes(formato.size).tobytes())
+
+    def array(self, dtype, n):
+        dtype = np.dtype(dtype)
+        return self.bytes(dtype.itemsize * n).view(dtype)
+
+
+def _leer_v1(lector, version_generador):
+    nivel, score, semilla_partida, semilla_siguiente, n_niveles, n_pista = lector.struct(PARTIDA)
+    estado = {
+        'nivel': nivel,
+        'score_total': score,
+        'semilla_partida': semilla_partida,
+        'semilla_siguiente': semilla_siguiente,
+        'pista_portal': lector.bytes(n_pista).tobytes().decode('utf-8'),
+        'semillas_niveles': lector.array('<u4', n_niveles).tolist(),
+        'rng': lector.array('<u4', ESTADO_RNG).tolist(),
+    }
+    (tipo, filas, columnas, semilla, tam_chunk, px, py, *jugador,
+     n_enemigos, n_cofres, n_chunks) = lector.struct(MAPA)
+    mapa = {
+        'tipo': tipo,
+        'filas': filas,
+        'columnas': columnas,
+        'seed': None if semilla == SIN_SEMILLA else semilla,
+        'tam_chunk': tam_chunk,
+        'portal': (px, py),
+        'jugador': dict(zip(CAMPOS_JUGADOR, jugador)),
+        'version_generador': version_generador,
+    }
+    if tipo == TIPO_CHUNKS:
+        claves = lector.array(REGISTRO_CHUNK, n_chunks).tolist()
+        revelado = {}
+        for ci, cj in claves:
+            alto = min(tam_chunk, filas - ci * tam_chunk)
+            ancho = min(tam_chunk, columnas - cj * tam_chunk)
+            bits = lector.bytes(_bytes_bits(alto * ancho))
+            revelado[(ci, cj)] = np.unpackbits(bits, count=alto * ancho).astype(bool).reshape(alto, ancho)
+        mapa['revelado'] = revelado
+    else:
+        celdas = filas * columnas
+        mapa['terreno'] = desempaquetar_2bits(lector.bytes(-(-celdas // 4)), (filas, columnas))
+        bits = lector.bytes(_bytes_bits(celdas))
+        mapa['revelado'] = np.unpackbits(bits, count=celdas).astype(bool).reshape(filas, columnas)
+    mapa['enemigos'] = np.array(lector.array(REGISTRO_ENEMIGO, n_enemigos))
+    mapa['cofres'] = np.array(lector.array(REGISTRO_COFRE, n_cofres))
+    estado['mapa'] = mapa
+    return estado
+
+
+# Lector de cada formato y migraciones formato -> formato + 1 (sobre el dict leído)
+LECTORES = {1: _leer_v1}
+MIGRACIONES = {}
+
+
+def leer_estado(ruta):
+    """Dict con el estado guardado, ya migrado al formato actual.
+
+    Lanza ValueError si el fichero no es una partida o es de un formato posterior.
+    """
+    with open(ruta, 'rb') as f:
+        try:
+            magia, formato, version, compresion, tamano = CABECERA.unpack(f.read(CABECERA.size))
+        except struct.error:
+            raise ValueError(f'{ruta}: no es una partida guardada')
+        if magia != MAGIA:
+            raise ValueError(f'{ruta}: no es una partida guardada')
+        if formato not in LECTORES:
+            raise ValueError(f'{ruta}: formato {formato} desconocido (el actual es {FORMATO})')
+        if compresion:
+            try:
+                cuerpo = np.frombuffer(_DESCOMPRIMIR[compresion](f.read()), np.uint8)
+            except (KeyError, zlib.error, lzma.LZMAError):
+                raise ValueError(f'{ruta}: cuerpo comprimido no válido')
+    if not compresion:
+        # Sin comprimir: el cuerpo se mapea en memoria, no se copia entero
+        cuerpo = np.memmap(ruta, dtype=np.uint8, mode='r', offset=CABECERA.size, shape=(tamano,)) \
+            if tamano else np.empty(0, np.uint8)
+    if len(cuerpo) != tamano:
+        raise ValueError(f'{ruta}: partida guardada truncada')
+    estado = LECTORES[formato](_Lector(cuerpo), version)
+    while formato < FORMATO:
+        estado = MIGRACIONES[formato](estado)
+        formato += 1
+    return estado
+
+
+def cargar_partida(ruta, semilla=None, proveedor_mapas=generar_nivel):
+    """Simulacion con la partida guardada en `ruta`, lista para seguir con step()."""
+    estado = leer_estado(ruta)
+    sim = Simulacion(semilla=semilla, proveedor_mapas=proveedor_mapas)
+    sim.nivel = estado['nivel']
+    sim.score_total = estado['score_total']
+    sim.pista_portal = estado['pista_portal']
+    sim.semilla_partida = estado['semilla_partida']
+    sim.semilla_siguiente = estado['semilla_siguiente']
+    sim.semillas_niveles = estado['semillas_niveles']
+    sim.rng.setstate((3, tuple(estado['rng']), None))
+    sim.mapa = _construir_mapa(estado['mapa'])
+    return sim
+
+
+def _construir_mapa(datos):
+    filas, columnas = datos['filas'], datos['columnas']
+    if datos['tipo'] == TIPO_CHUNKS:
+        # El terreno se regenera: tiene que salir del mismo generador
+        if datos['version_generador'] != VERSION_GENERADOR:
+            raise ValueError(f'mundo por chunks del generador v{datos["version_generador"]}, '
+                             f'el actual es v{VERSION_GENERADOR}')
+        mapa = MapaChunks(filas, columnas, datos['seed'], tam_chunk=datos['tam_chunk'])
+        mapa.portal = datos['portal']
+        # Chunks ya poblados: sus entidades vienen del fichero
+        for (ci, cj), revelado in datos['revelado'].items():
+            mapa.restaurar_chunk(ci, cj, revelado)
+    else:
+        mapa = Mapa(filas, columnas, datos['seed'])
+        mapa.base_matriz = datos['terreno']
+        mapa.revelado = datos['revelado']
+        mapa.portal = datos['portal']
+    mapa.jugador = Personaje(0, 0)
+    for campo, valor in datos['jugador'].items():
+        setattr(mapa.jugador, campo, valor)
+
+    almacen = mapa.entidades
+    enemigos = datos['enemigos']
+    if len(enemigos):
+        ids = almacen.agregar_enemigos(enemigos['x'], enemigos['y'], enemigos['vision'])
+        almacen.edx[ids] = enemigos['dx']
+        almacen.edy[ids] = enemigos['dy']
+        almacen.ultimo_mov[ids] = enemigos['ultimo_mov']
+        for i in ids[enemigos['vivo'] == 0].tolist():
+            almacen.quitar_enemigo(i)
+    cofres = datos['cofres']
+    if len(cofres):
+        ids = almacen.agregar_cofres(cofres['x'], cofres['y'], cofres['contenido'], cofres['valor'])
+        for i in ids[cofres['abierto'] != 0].tolist():
+            almacen.abrir_cofre(i)
+    return mapa
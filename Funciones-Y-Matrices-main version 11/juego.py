@@ -1,12 +1,13 @@
 # Clase Juego (lógica principal y bucle)
 import pygame
+import io
 import sys
 import math
-import random
+import time
 from pathlib import Path
 
-from config import SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE, VISIBLE_RADIUS, FPS
-from config import BLACK, WHITE, GRAY, DARK_GRAY, GREEN, BROWN, RED, BLUE, YELLOW, PURPLE
+from config import SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE, FPS
+from config import BLACK, WHITE, GRAY, DARK_GRAY, GREEN, BROWN, RED, BLUE, YELLOW
 
 # Minimap (defaults si faltan)
 try:
@@ -16,15 +17,6 @@ except Exception:
     MINIMAP_MAX_H = 180
     MINIMAP_MARGIN = 10
 
-# Puntajes
-try:
-    from config import SCORE_ITEM, SCORE_ENEMY, SCORE_LEVEL, SCORE_LEVEL_BONUS_PER_LEVEL
-except Exception:
-    SCORE_ITEM = 50
-    SCORE_ENEMY = 100
-    SCORE_LEVEL = 500
-    SCORE_LEVEL_BONUS_PER_LEVEL = 50
-
 # Texturas & sonidos & HUD & título/gameover
 try:
     from config import IMG_PLAYER, IMG_ENEMY, IMG_CHEST, IMG_PORTAL, IMG_FLOOR, IMG_WALL, RENDER_SCALE
@@ -59,23 +51,102 @@ except Exception:
     GAMEOVER_SCORE_Y_FACTOR = 0.35
     GAMEOVER_SCORE_OFFSET = 10
 
+# Caché de niveles en disco (None = desactivada)
+try:
+    from config import LEVEL_CACHE_DIR, LEVEL_CACHE_MAX_MB, GAME_SEED
+except Exception:
+    LEVEL_CACHE_DIR = None
+    LEVEL_CACHE_MAX_MB = 64
+    GAME_SEED = None
+
+try:
+    from config import CHUNK_MODE_MIN_CELLS
+except Exception:
+    CHUNK_MODE_MIN_CELLS = 512 * 512
+
+try:
+    from config import ASSET_CACHE_DIR, ASSET_CACHE_MAX_MB
+except Exception:
+    ASSET_CACHE_DIR = None
+    ASSET_CACHE_MAX_MB = 64
+
+try:
+    from config import PROFILE_DIR
+except Exception:
+    PROFILE_DIR = 'perfiles'
+
+try:
+    from config import REPLAY_DIR
+except Exception:
+    REPLAY_DIR = None
+
+try:
+    from config import SAVE_FILE, SAVE_COMPRESSION
+except Exception:
+    SAVE_FILE = 'partida.sav'
+    SAVE_COMPRESSION = 'zlib'
+
+try:
+    from config import RENDER_CHUNK_TILES, RENDER_CHUNK_MARGIN
+except Exception:
+    RENDER_CHUNK_TILES = 4
+    RENDER_CHUNK_MARGIN = 8
+
 from mapa import Mapa
+from pregeneracion import PreGenerador
+from cache_niveles import CacheNiveles
+from mapa_chunks import MapaChunks
+from simulacion import Simulacion
+from capa_terreno import CapaTerreno
+from minimapa import Minimapa
+from cache_textos import CacheTextos
+from cache_assets import CacheAssets
+from cargador import CargadorAssets
+from perfil import Perfilador
+from repeticion import Repeticion, EXTENSION as EXTENSION_REPETICION
+from guardado import guardar_partida, cargar_partida
+
+
+def _leer_fichero(ruta):
+    with open(ruta, 'rb') as f:
+        return f.read()
+
+
+# Teclas de movimiento -> acciones de Simulacion.step
+TECLAS_ACCION = {
+    pygame.K_w: 'arriba',
+    pygame.K_s: 'abajo',
+    pygame.K_a: 'izquierda',
+    pygame.K_d: 'derecha',
+}
 
 class Juego:
     def __init__(self):
-        self.mapa_actual = None
-        self.nivel = 1
+        # Reglas y estado de la partida (sin pygame); None en la pantalla de inicio
+        self.sim = None
         self.screen = None
         self.clock = pygame.time.Clock()
         self.font = None
+        self.font_perfil = None
+        self.textos = CacheTextos()
+        # Bloque izquierdo del HUD ya compuesto y los valores con los que se hizo
+        self.hud_superficie = None
+        self.hud_clave = None
         self.mensaje = ''
         self.mensaje_tiempo = 0
-        self.pista_portal = ''
         self.estado = 'inicio'
-        self.score_total = 0
         self.flash_score_text = ''
         self.flash_score_time = 0
         self.flash_score_duration = 1500
+        # Grabación de la partida en curso (ver repeticion.py)
+        self.repeticion = None
+        # Perfilado por fases (F3 muestra/oculta, F4 exporta la traza)
+        self.perfil = Perfilador()
+        # Render bajo demanda: se redibuja solo si algo cambió
+        self.redibujar_todo = True   # la pantalla entera está desactualizada
+        self.rects_sucios = []       # o solo estas zonas (p. ej. un mensaje que caducó)
+        self.rect_mensaje = None
+        self.rect_flash = None
         self.tile_px = int(TILE_SIZE * (RENDER_SCALE if isinstance(RENDER_SCALE, (int, float)) else 1.0))
         # texturas
         self.tex_player = None
@@ -84,6 +155,9 @@ class Juego:
         self.tex_portal = None
         self.tex_floor = None
         self.tex_wall = None
+        # Terreno pre-renderizado por bloques (se crea cuando las texturas están listas)
+        self.capa_terreno = None
+        self.minimapa = Minimapa()
         # HUD icons
         self.hud_heart_full = None
         self.hud_heart_empty = None
@@ -99,202 +173,422 @@ class Juego:
         # imágenes título y gameover
         self.title_scaled = None
         self.gameover_scaled = None
+        # Imágenes ya escaladas guardadas en disco entre arranques
+        self.assets = CacheAssets(ASSET_CACHE_DIR, ASSET_CACHE_MAX_MB * 1024 * 1024)
+        # Carga en segundo plano (se crea con la ventana)
+        self.cargador = None
+        self.assets_juego = []       # lo que hace falta antes de empezar a jugar
+        self.musicas = {}            # clave -> (bytes del fichero o None, ruta)
+        self.musica_deseada = None
+        self.musica_stream = None
+        # Pre-generación del siguiente nivel (semilla decidida de antemano)
+        self.pregenerador = PreGenerador()
+        self.cache_niveles = CacheNiveles(LEVEL_CACHE_DIR, LEVEL_CACHE_MAX_MB * 1024 * 1024) if LEVEL_CACHE_DIR else None
+
+    # Estado de la partida (delegado en la simulación)
+    @property
+    def mapa_actual(self):
+        return self.sim.mapa if self.sim is not None else None
+
+    @property
+    def nivel(self):
+        return self.sim.nivel if self.sim is not None else 1
+
+    @property
+    def score_total(self):
+        return self.sim.score_total if self.sim is not None else 0
+
+    @property
+    def pista_portal(self):
+        return self.sim.pista_portal if self.sim is not None else ''
 
     def iniciar_pygame(self):
-        pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN])
+        pygame.init()
+        pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN, pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED])
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption('Aventura optimizada (corazones y puntuación)')
         self.font = pygame.font.SysFont(None, 32)
-        self.cargar_texturas()
-        self.cargar_sonidos()
+        self.font_perfil = pygame.font.SysFont('monospace', 14)
+        self.iniciar_audio()
+        # Todo se carga en segundo plano: la ventana aparece enseguida con una
+        # barra de progreso y el título se muestra en cuanto su imagen esté lista
+        self.cargador = CargadorAssets()
         self.cargar_imagen_titulo()
-        self.cargar_imagen_gameover()
-        # Música: título (loop) desde el inicio
+        # Música: título (loop) desde el inicio, en cuanto se haya leído
         self.play_title_music()
+        self.cargar_texturas()
+        self.cargar_sonidos()
+
+    def iniciar_audio(self):
+        try:
+            pygame.mixer.init()
+        except Exception:
+            pass
+
+    def _pedir_imagen(self, atributo, ruta, ancho, alto, alpha, respaldo, ajustar=False):
+        """Carga en segundo plano; al terminar la convierte y la guarda en self.<atributo>."""
+        def al_terminar(superficie):
+            if superficie is None:
+                superficie = respaldo()
+            else:
+                superficie = superficie.convert_alpha() if alpha else superficie.convert()
+            setattr(self, atributo, superficie)
+        self.cargador.pedir(atributo, self.assets.pixeles, ruta, ancho, alto, alpha, ajustar,
+                            al_terminar=al_terminar)
 
     def cargar_texturas(self):
-        def load_scaled(path, use_alpha=True):
-            try:
-                img = pygame.image.load(path)
-                img = img.convert_alpha() if use_alpha else img.convert()
-                return pygame.transform.smoothscale(img, (self.tile_px, self.tile_px))
-            except Exception:
+        def placeholder(use_alpha=True):
+            def crear():
                 surf = pygame.Surface((self.tile_px, self.tile_px), pygame.SRCALPHA if use_alpha else 0)
                 surf.fill((200, 0, 200, 180) if use_alpha else (200, 0, 200))
                 return surf.convert_alpha() if use_alpha else surf.convert()
-        self.tex_player = load_scaled(IMG_PLAYER, True)
-        self.tex_enemy  = load_scaled(IMG_ENEMY, True)
-        self.tex_chest  = load_scaled(IMG_CHEST, True)
-        self.tex_portal = load_scaled(IMG_PORTAL, True)
-        self.tex_floor  = load_scaled(IMG_FLOOR, False)
-        self.tex_wall   = load_scaled(IMG_WALL, False)
+            return crear
+        for atributo, ruta, use_alpha in (
+                ('tex_player', IMG_PLAYER, True),
+                ('tex_enemy', IMG_ENEMY, True),
+                ('tex_chest', IMG_CHEST, True),
+                ('tex_portal', IMG_PORTAL, True),
+                ('tex_floor', IMG_FLOOR, False),
+                ('tex_wall', IMG_WALL, False)):
+            self._pedir_imagen(atributo, ruta, self.tile_px, self.tile_px, use_alpha, placeholder(use_alpha))
+            self.assets_juego.append(atributo)
         # HUD icons (24 px)
-        def load_hud(path):
-            try:
-                img = pygame.image.load(path).convert_alpha()
-                return pygame.transform.smoothscale(img, (24, 24))
-            except Exception:
-                surf = pygame.Surface((24,24), pygame.SRCALPHA)
-                surf.fill((255,0,255,150))
-                return surf
-        self.hud_heart_full  = load_hud(HUD_HEART_FULL)
-        self.hud_heart_empty = load_hud(HUD_HEART_EMPTY)
-        self.hud_armor_on    = load_hud(HUD_ARMOR_ON)
-        self.hud_armor_off   = load_hud(HUD_ARMOR_OFF)
-        self.hud_sword_on    = load_hud(HUD_SWORD_ON)
-        self.hud_sword_off   = load_hud(HUD_SWORD_OFF)
+        def placeholder_hud():
+            surf = pygame.Surface((24,24), pygame.SRCALPHA)
+            surf.fill((255,0,255,150))
+            return surf
+        for atributo, ruta in (
+                ('hud_heart_full', HUD_HEART_FULL),
+                ('hud_heart_empty', HUD_HEART_EMPTY),
+                ('hud_armor_on', HUD_ARMOR_ON),
+                ('hud_armor_off', HUD_ARMOR_OFF),
+                ('hud_sword_on', HUD_SWORD_ON),
+                ('hud_sword_off', HUD_SWORD_OFF)):
+            self._pedir_imagen(atributo, ruta, 24, 24, True, placeholder_hud)
+            self.assets_juego.append(atributo)
 
     def cargar_sonidos(self):
+        # FX (el mezclador ya está iniciado; si no lo está, Sound falla y queda None)
+        def load_fx(path, vol=FX_VOLUME):
+            s = pygame.mixer.Sound(path)
+            s.set_volume(vol)
+            return s
+        for atributo, ruta in (
+                ('snd_chest', SND_CHEST),
+                ('snd_sword', SND_SWORD),
+                ('snd_hurt', SND_HURT),
+                ('snd_portal', SND_PORTAL)):
+            self.cargador.pedir(atributo, load_fx, ruta,
+                                al_terminar=lambda sonido, atributo=atributo: setattr(self, atributo, sonido))
+            self.assets_juego.append(atributo)
+
+    def esperar_assets_juego(self):
+        """Antes de jugar: espera texturas, HUD y efectos mostrando el progreso."""
+        while self.cargador.pendiente(*self.assets_juego):
+            self.cargador.recoger()
+            pygame.event.pump()
+            self.dibujar_pantalla_carga()
+            pygame.display.flip()
+            self.clock.tick(30)
+        if self.capa_terreno is None:
+            self.capa_terreno = CapaTerreno(self.tile_px, self.tex_floor, self.tex_wall, self.tex_portal,
+                                            SCREEN_WIDTH, SCREEN_HEIGHT, RENDER_CHUNK_TILES, RENDER_CHUNK_MARGIN)
+
+    # Música: el fichero se lee en segundo plano y se reproduce desde memoria
+    def _pedir_musica(self, clave, ruta):
+        def al_terminar(datos):
+            self.musicas[clave] = (datos, ruta)
+            if self.musica_deseada == clave:
+                self._tocar_musica(clave)
+        self.cargador.pedir('musica_' + clave, _leer_fichero, ruta, al_terminar=al_terminar)
+
+    def _tocar_musica(self, clave):
+        # Si aún se está leyendo, sonará al terminar (ver _pedir_musica)
+        self.musica_deseada = clave
+        datos, ruta = self.musicas.get(clave, (None, None))
+        if datos is None:
+            return
         try:
-            pygame.mixer.init()
-            # FX
-            def load_fx(path, vol=FX_VOLUME):
-                try:
-                    s = pygame.mixer.Sound(path)
-                    s.set_volume(vol)
-                    return s
-                except Exception:
-                    return None
-            self.snd_chest  = load_fx(SND_CHEST)
-            self.snd_sword  = load_fx(SND_SWORD)
-            self.snd_hurt   = load_fx(SND_HURT)
-            self.snd_portal = load_fx(SND_PORTAL)
-        except Exception:
-            pass
-
-    def play_title_music(self):
-        try:
-            pygame.mixer.music.load(SND_MUSIC_TITLE)
+            self.musica_stream = io.BytesIO(datos)
+            pygame.mixer.music.load(self.musica_stream, Path(ruta).suffix.lstrip('.'))
             pygame.mixer.music.set_volume(MUSIC_VOLUME)
             pygame.mixer.music.play(-1)
         except Exception:
             pass
 
+    def play_title_music(self):
+        self._pedir_musica('titulo', SND_MUSIC_TITLE)
+        self._tocar_musica('titulo')
+
     def play_gameover_music(self):
-        try:
-            pygame.mixer.music.load(SND_MUSIC_GAMEOVER)
-            pygame.mixer.music.set_volume(MUSIC_VOLUME)
-            pygame.mixer.music.play(-1)
-        except Exception:
-            pass
+        self._pedir_musica('gameover', SND_MUSIC_GAMEOVER)
+        self._tocar_musica('gameover')
+
+    def _respaldo_pantalla(self):
+        surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        surf.fill(BLACK)
+        return surf
 
     def cargar_imagen_titulo(self):
-        try:
-            bg = pygame.image.load(TITLE_IMAGE).convert()
-            img_w, img_h = bg.get_width(), bg.get_height()
-            win_w, win_h = SCREEN_WIDTH, SCREEN_HEIGHT
-            scale = min(win_w / img_w, win_h / img_h)
-            new_w = int(img_w * scale)
-            new_h = int(img_h * scale)
-            self.title_scaled = pygame.transform.smoothscale(bg, (new_w, new_h))
-        except Exception:
-            self.title_scaled = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-            self.title_scaled.fill(BLACK)
+        # Ajustada a la ventana sin deformar (letterbox)
+        self._pedir_imagen('title_scaled', TITLE_IMAGE, SCREEN_WIDTH, SCREEN_HEIGHT, False,
+                           self._respaldo_pantalla, ajustar=True)
 
     def cargar_imagen_gameover(self):
+        # Perezosa: se pide al empezar la primera partida, no al arrancar
+        self._pedir_imagen('gameover_scaled', GAMEOVER_IMAGE, SCREEN_WIDTH, SCREEN_HEIGHT, False,
+                           self._respaldo_pantalla, ajustar=True)
+        self._pedir_musica('gameover', SND_MUSIC_GAMEOVER)
+
+    def nuevo_mapa(self, filas, columnas, seed):
+        """Proveedor de mapas de la simulación: pre-generado, de la caché en disco o en síncrono."""
+        if filas * columnas >= CHUNK_MODE_MIN_CELLS:
+            # Mundo por chunks: se genera al explorarlo, no hay nada que esperar
+            mapa = MapaChunks(filas, columnas, seed)
+            mapa.generar_mapa()
+            return mapa
+        mapa = self.pregenerador.tomar(filas, columnas, seed)
+        if mapa is not None:
+            # El proceso de pre-generación ya lo dejó en la caché de niveles
+            return mapa
+        if self.cache_niveles is not None:
+            return self.cache_niveles.mapa(filas, columnas, seed)
+        mapa = Mapa(filas, columnas, seed)
+        mapa.generar_mapa()
+        return mapa
+
+    def pregenerar_siguiente(self):
+        # El tamaño y la semilla del próximo nivel se conocen ya
+        filas, columnas, seed = self.sim.siguiente_nivel()
+        if filas * columnas >= CHUNK_MODE_MIN_CELLS:
+            return
+        if self.cache_niveles is not None and self.cache_niveles.contiene(filas, columnas, seed):
+            return
+        self.pregenerador.solicitar(filas, columnas, seed, self.cache_niveles)
+
+    def aplicar_eventos(self, eventos):
+        """Traduce los eventos de la simulación a mensajes, sonidos y cambios de pantalla."""
+        for evento in eventos:
+            tipo = evento[0]
+            if tipo == 'mensaje':
+                self.mostrar_mensaje(evento[1])
+            elif tipo == 'flash':
+                self.mostrar_flash_score(evento[1])
+            elif tipo == 'revelado':
+                self.capa_terreno.estampar(evento[1], evento[2])
+                self.minimapa.estampar(evento[1], evento[2])
+            elif tipo == 'cofre':
+                if self.snd_chest: self.snd_chest.play()
+            elif tipo == 'espada':
+                if self.snd_sword: self.snd_sword.play()
+            elif tipo == 'herida':
+                if self.snd_hurt: self.snd_hurt.play()
+            elif tipo == 'portal':
+                if self.snd_portal: self.snd_portal.play()
+            elif tipo == 'nivel':
+                self.pregenerar_siguiente()
+            elif tipo == 'gameover':
+                self.estado = 'gameover'
+                self.guardar_repeticion()
+                try:
+                    pygame.mixer.music.fadeout(400)
+                except Exception:
+                    pass
+                self.play_gameover_music()
+
+    def guardar_partida(self):
         try:
-            bg = pygame.image.load(GAMEOVER_IMAGE).convert()
-            img_w, img_h = bg.get_width(), bg.get_height()
-            win_w, win_h = SCREEN_WIDTH, SCREEN_HEIGHT
-            scale = min(win_w / img_w, win_h / img_h)
-            new_w = int(img_w * scale)
-            new_h = int(img_h * scale)
-            self.gameover_scaled = pygame.transform.smoothscale(bg, (new_w, new_h))
-        except Exception:
-            self.gameover_scaled = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-            self.gameover_scaled.fill(BLACK)
+            Path(SAVE_FILE).parent.mkdir(parents=True, exist_ok=True)
+            guardar_partida(self.sim, SAVE_FILE, SAVE_COMPRESSION)
+        except OSError as e:
+            self.mostrar_mensaje(f'No se pudo guardar la partida: {e}')
+            return
+        self.mostrar_mensaje('Partida guardada (F9 para cargarla)')
+
+    def cargar_partida(self):
+        """Sustituye la partida en curso (o la pantalla de inicio) por la guardada."""
+        try:
+            sim = cargar_partida(SAVE_FILE, semilla=GAME_SEED, proveedor_mapas=self.nuevo_mapa)
+        except (OSError, ValueError) as e:
+            if self.estado == 'jugando':
+                self.mostrar_mensaje(f'No se pudo cargar la partida: {e}')
+            return
+        if self.estado == 'inicio':
+            self.esperar_assets_juego()
+            self.cargar_imagen_gameover()
+        self.guardar_repeticion()
+        self.sim = sim
+        self.estado = 'jugando'
+        self.flash_score_text = ''
+        # La grabación necesita la partida desde el principio: no se graba
+        self.repeticion = None
+        self.mostrar_mensaje(f'--- Nivel {sim.nivel} (partida cargada) ---')
+        self.pregenerar_siguiente()
+
+    def guardar_repeticion(self):
+        """Escribe la grabación de la partida en REPLAY_DIR; si falla, se pierde sin más."""
+        if self.repeticion is None or not len(self.repeticion):
+            return
+        nombre = time.strftime('partida_%Y%m%d_%H%M%S') + f'_{self.repeticion.semilla}{EXTENSION_REPETICION}'
+        try:
+            Path(REPLAY_DIR).mkdir(parents=True, exist_ok=True)
+            self.repeticion.guardar(Path(REPLAY_DIR) / nombre)
+        except OSError:
+            pass
+        self.repeticion = None
 
-    def cambiar_mapa(self, filas, columnas):
-        if self.mapa_actual is None:
-            self.mapa_actual = Mapa(filas, columnas)
-            self.mapa_actual.generar_mapa()
+    def marcar_sucio(self, rect=None):
+        """Pide redibujar: toda la pantalla (rect=None) o solo `rect`."""
+        if rect is None:
+            self.redibujar_todo = True
         else:
-            j_prev = self.mapa_actual.jugador
-            self.mapa_actual = Mapa(filas, columnas)
-            self.mapa_actual.generar_mapa()
-            j = self.mapa_actual.jugador
-            j.corazones_totales = j_prev.corazones_totales
-            j.corazones_llenos = j_prev.corazones_llenos
-            j.armaduras = j_prev.armaduras
-            j.espadas = j_prev.espadas
-            j.puntuacion = j_prev.puntuacion
-        self.mostrar_mensaje(f'--- Nivel {self.nivel} ---')
-        px, py = self.mapa_actual.portal
-        self.pista_portal = f'({px}, ?)' if random.choice([True, False]) else f'(?, {py})'
+            self.rects_sucios.append(rect)
+
+    def espera_maxima(self):
+        """Milisegundos hasta que caduque el mensaje o el flash (0 = esperar sin límite)."""
+        ahora = pygame.time.get_ticks()
+        plazos = []
+        if self.estado == 'jugando' and self.mensaje:
+            plazos.append(self.mensaje_tiempo + 3000 - ahora)
+        if self.flash_score_text:
+            plazos.append(self.flash_score_time + self.flash_score_duration - ahora)
+        if self.cargador.pendiente():
+            # Revisar las cargas en segundo plano a menudo (barra de progreso)
+            plazos.append(50)
+        return max(1, min(plazos)) if plazos else 0
+
+    def caducar_textos(self):
+        ahora = pygame.time.get_ticks()
+        if self.estado == 'jugando' and self.mensaje and ahora - self.mensaje_tiempo > 3000:
+            self.mensaje = ''
+            self.marcar_sucio(self.rect_mensaje)
+        if self.flash_score_text and (ahora - self.flash_score_time > self.flash_score_duration):
+            self.flash_score_text = ''
+            self.marcar_sucio(self.rect_flash)
+
+    def manejar_evento(self, event):
+        """Aplica un evento de pygame; devuelve False si hay que salir del juego."""
+        if event.type == pygame.QUIT:
+            return False
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            self.marcar_sucio()
+            return True
+        if event.type != pygame.KEYDOWN:
+            return True
+        if event.key == pygame.K_q:
+            return False
+        if event.key == pygame.K_F3:
+            self.perfil.alternar()
+            self.marcar_sucio()
+        elif event.key == pygame.K_F4:
+            self.exportar_perfil()
+            self.marcar_sucio()
+        elif event.key == pygame.K_F5 and self.estado == 'jugando':
+            self.guardar_partida()
+            self.marcar_sucio()
+        elif event.key == pygame.K_F9 and self.estado in ('inicio', 'jugando'):
+            self.cargar_partida()
+            self.marcar_sucio()
+            return True
+        if self.estado == 'inicio':
+            if event.key == pygame.K_RETURN:
+                self.esperar_assets_juego()
+                self.cargar_imagen_gameover()
+                self.estado = 'jugando'
+                self.flash_score_text = ''
+                self.sim = Simulacion(semilla=GAME_SEED, proveedor_mapas=self.nuevo_mapa)
+                self.aplicar_eventos(self.sim.nuevo_juego())
+                self.repeticion = Repeticion.empezar(self.sim, CHUNK_MODE_MIN_CELLS) if REPLAY_DIR else None
+                self.marcar_sucio()
+        elif self.estado == 'gameover':
+            if event.key == pygame.K_RETURN:
+                self.estado = 'inicio'
+                self.sim = None
+                self.mensaje = ''
+                self.flash_score_text = ''
+                try:
+                    pygame.mixer.music.fadeout(200)
+                except Exception:
+                    pass
+                self.play_title_music()
+                self.marcar_sucio()
+        elif self.estado == 'jugando':
+            accion = TECLAS_ACCION.get(event.key)
+            if accion is not None:
+                j = self.sim.mapa.jugador
+                movimientos = j.movimientos
+                with self.perfil.seccion('turno'):
+                    eventos = self.sim.step(accion)
+                # Chocar contra un muro no cambia nada en pantalla (ni se graba)
+                if eventos or j.movimientos != movimientos:
+                    if self.repeticion is not None:
+                        self.repeticion.registrar(accion, self.sim)
+                    self.aplicar_eventos(eventos)
+                    self.marcar_sucio()
+        return True
 
     def iniciar(self):
         self.iniciar_pygame()
         running = True
         while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_q:
-                        running = False
-                    if self.estado == 'inicio':
-                        if event.key == pygame.K_RETURN:
-                            self.estado = 'jugando'
-                            self.nivel = 1
-                            self.mapa_actual = None
-                            self.score_total = 0
-                            self.flash_score_text = ''
-                            self.cambiar_mapa(15, 15)
-                    elif self.estado == 'gameover':
-                        if event.key == pygame.K_RETURN:
-                            self.estado = 'inicio'
-                            self.mapa_actual = None
-                            self.nivel = 1
-                            self.mensaje = ''
-                            self.pista_portal = ''
-                            self.flash_score_text = ''
-                            try:
-                                pygame.mixer.music.fadeout(200)
-                            except Exception:
-                                pass
-                            self.play_title_music()
-                    elif self.estado == 'jugando':
-                        dx, dy = 0, 0
-                        if event.key == pygame.K_w: dx = -1
-                        elif event.key == pygame.K_s: dx = 1
-                        elif event.key == pygame.K_a: dy = -1
-                        elif event.key == pygame.K_d: dy = 1
-                        if dx != 0 or dy != 0:
-                            if self.mapa_actual.jugador.mover(dx, dy, self.mapa_actual.base_matriz):
-                                self.mapa_actual.revelar_area(self.mapa_actual.jugador.x, self.mapa_actual.jugador.y, VISIBLE_RADIUS)
-                                for enemigo in self.mapa_actual.enemigos:
-                                    enemigo.mover_hacia_jugador(self.mapa_actual.jugador, self.mapa_actual.base_matriz, self.mapa_actual.jugador.movimientos)
-                                self.verificar_cofre()
-                                if self.resolver_colisiones_enemigos():
-                                    pass
-                                if self.estado == 'jugando' and self.verificar_portal():
-                                    level_bonus = SCORE_LEVEL + (self.nivel * SCORE_LEVEL_BONUS_PER_LEVEL)
-                                    self.score_total += level_bonus
-                                    if self.snd_portal: self.snd_portal.play()
-                                    self.mostrar_flash_score(f'+{level_bonus}')
-                                    self.mostrar_mensaje(f'¡Portal encontrado! Bonus nivel {self.nivel}: +{level_bonus} puntos. Pasando al siguiente nivel...')
-                                    self.nivel += 1
-                                    j = self.mapa_actual.jugador
-                                    j.corazones_totales += 1
-                                    self.recargar_corazones(j)
-                                    self.cambiar_mapa(15 + self.nivel, 15 + self.nivel)
-            if self.estado == 'jugando':
-                if pygame.time.get_ticks() - self.mensaje_tiempo > 3000:
-                    self.mensaje = ''
-            if self.flash_score_text and (pygame.time.get_ticks() - self.flash_score_time > self.flash_score_duration):
-                self.flash_score_text = ''
-            if self.estado == 'inicio':
-                self.dibujar_pantalla_inicio()
-            elif self.estado == 'jugando':
-                self.dibujar()
-            elif self.estado == 'gameover':
-                self.dibujar_pantalla_gameover()
-            self.clock.tick(FPS)
+            # Juego por turnos: sin teclas ni textos por caducar no hay nada que
+            # dibujar, así que se bloquea esperando el siguiente evento
+            primero = pygame.event.wait(self.espera_maxima())
+            dibujado = False
+            with self.perfil.seccion('marco'):
+                with self.perfil.seccion('eventos'):
+                    for event in [primero] + pygame.event.get():
+                        running = self.manejar_evento(event) and running
+                with self.perfil.seccion('assets'):
+                    if self.cargador.recoger():
+                        self.marcar_sucio()
+                self.caducar_textos()
+                if self.redibujar_todo or self.rects_sucios:
+                    with self.perfil.seccion('dibujar'):
+                        if self.estado == 'inicio':
+                            self.dibujar_pantalla_inicio()
+                        elif self.estado == 'jugando':
+                            self.dibujar()
+                        elif self.estado == 'gameover':
+                            self.dibujar_pantalla_gameover()
+                    if self.perfil.activo:
+                        self.dibujar_perfil()
+                    with self.perfil.seccion('presentar'):
+                        if self.redibujar_todo:
+                            pygame.display.flip()
+                        else:
+                            pygame.display.update(self.rects_sucios)
+                    self.redibujar_todo = False
+                    self.rects_sucios = []
+                    dibujado = True
+            if dibujado:
+                # Límite de redibujados por segundo si llegan muchas teclas
+                # seguidas (fuera de 'marco': es espera, no trabajo)
+                self.clock.tick(FPS)
+        if self.estado == 'jugando':
+            self.guardar_repeticion()
+        self.pregenerador.cerrar()
+        self.cargador.cerrar()
         pygame.quit()
         sys.exit()
 
     # Pantallas
+    def dibujar_pantalla_carga(self):
+        """Barra de progreso de la carga de assets."""
+        self.screen.fill(BLACK)
+        ancho, alto = SCREEN_WIDTH // 2, 24
+        x, y = (SCREEN_WIDTH - ancho) // 2, SCREEN_HEIGHT // 2
+        pygame.draw.rect(self.screen, DARK_GRAY, (x, y, ancho, alto))
+        pygame.draw.rect(self.screen, YELLOW, (x, y, int(ancho * self.cargador.progreso()), alto))
+        pygame.draw.rect(self.screen, WHITE, (x, y, ancho, alto), 2)
+        texto = self.textos.render(self.font, 'Cargando...', WHITE)
+        self.screen.blit(texto, texto.get_rect(center=(SCREEN_WIDTH // 2, y - 24)))
+
     def dibujar_pantalla_inicio(self):
+        if self.title_scaled is None:
+            # La imagen del título aún se está cargando
+            self.dibujar_pantalla_carga()
+            return
         # Letterbox: centrado sin deformar la imagen
         self.screen.fill(BLACK)
         if self.title_scaled:
@@ -303,7 +597,6 @@ class Juego:
             x = (win_w - new_w) // 2
             y = (win_h - new_h) // 2
             self.screen.blit(self.title_scaled, (x, y))
-        pygame.display.flip()
 
     def dibujar_pantalla_gameover(self):
         self.screen.fill(BLACK)
@@ -324,7 +617,7 @@ class Juego:
             except Exception:
                 y_off = 10
             anchor_y = go_y + int(go_h * y_factor)
-            puntaje_surface = self.font.render(f"Puntaje: {self.score_total}", True, WHITE)
+            puntaje_surface = self.textos.render(self.font, f"Puntaje: {self.score_total}", WHITE)
             px = go_x + (go_w - puntaje_surface.get_width()) // 2
             py = max(10, anchor_y - y_off - puntaje_surface.get_height())
             # Caja semitransparente opcional para contraste
@@ -334,12 +627,56 @@ class Juego:
             self.screen.blit(puntaje_surface, (px, py))
         else:
             # Fallback: solo texto
-            puntaje_surface = self.font.render(f"Puntaje: {self.score_total}", True, WHITE)
+            puntaje_surface = self.textos.render(self.font, f"Puntaje: {self.score_total}", WHITE)
             px = (SCREEN_WIDTH - puntaje_surface.get_width()) // 2
             py = 20
             self.screen.blit(puntaje_surface, (px, py))
-        
-        pygame.display.flip()
+
+    def dibujar_perfil(self):
+        """Panel del perfilador: p50/p99 por fase y gráfica de los últimos marcos."""
+        # Las cifras cambian en cada marco: render directo, sin pasar por
+        # self.textos (solo llenarían la caché de entradas que no se repiten)
+        fuente = self.font_perfil
+        filas = self.perfil.resumen()
+        ancho, alto_linea, alto_grafica = 230, 18, 60
+        alto = 8 + alto_linea * (len(filas) + 1) + alto_grafica + 8
+        panel = pygame.Rect(SCREEN_WIDTH - ancho - 10, SCREEN_HEIGHT - alto - 10, ancho, alto)
+        # Fondo opaco: con update() parcial no se acumulan capas translúcidas
+        pygame.draw.rect(self.screen, (20, 20, 20), panel)
+        pygame.draw.rect(self.screen, GRAY, panel, 1)
+        x, y = panel.x + 8, panel.y + 6
+        self.screen.blit(fuente.render(f'{"fase":<10}{"p50 ms":>8}{"p99 ms":>8}', True, YELLOW), (x, y))
+        for nombre, p50, p99 in filas:
+            y += alto_linea
+            self.screen.blit(fuente.render(f'{nombre:<10}{p50:>8.2f}{p99:>8.2f}', True, WHITE), (x, y))
+        # Barras de duración de 'marco' (la más reciente a la derecha); la
+        # línea marca 16.7 ms (60 fps) y la escala llega a 33 ms
+        base_y = panel.bottom - 8
+        limite = 33.3
+        marcos = self.perfil.ultimos('marco')[-(ancho - 16) // 2:]
+        for k, ms in enumerate(marcos):
+            h = int(min(ms, limite) / limite * alto_grafica)
+            color = GREEN if ms <= 16.7 else RED
+            pygame.draw.line(self.screen, color, (x + 2 * k, base_y), (x + 2 * k, base_y - h))
+        y60 = base_y - int(16.7 / limite * alto_grafica)
+        pygame.draw.line(self.screen, YELLOW, (x, y60), (panel.right - 8, y60))
+        if not self.redibujar_todo:
+            self.rects_sucios.append(panel)
+
+    def exportar_perfil(self):
+        """Guarda la traza del perfilador en CSV y en formato de Chrome (chrome://tracing)."""
+        if not self.perfil.traza:
+            self.mostrar_mensaje('Perfilador sin datos (F3 para activarlo)')
+            return
+        base = Path(PROFILE_DIR) / time.strftime('perfil_%Y%m%d_%H%M%S')
+        try:
+            base.parent.mkdir(parents=True, exist_ok=True)
+            self.perfil.exportar_csv(base.with_suffix('.csv'))
+            self.perfil.exportar_chrome(base.with_suffix('.json'))
+        except OSError as e:
+            self.mostrar_mensaje(f'No se pudo exportar el perfil: {e}')
+            return
+        self.mostrar_mensaje(f'Perfil guardado en {base.name}.csv/.json')
 
     # Lógica
     def mostrar_mensaje(self, texto):
@@ -349,107 +686,6 @@ class Juego:
         self.flash_score_text = texto
         self.flash_score_time = pygame.time.get_ticks()
 
-    def resolver_colisiones_enemigos(self):
-        j = self.mapa_actual.jugador
-        colisionados = [e for e in self.mapa_actual.enemigos if j.x == e.x and j.y == e.y]
-        if not colisionados:
-            return False
-        for e in colisionados:
-            if j.espadas > 0:
-                j.espadas -= 1
-                self.mapa_actual.enemigos.remove(e)
-                self.score_total += SCORE_ENEMY
-                if self.snd_sword: self.snd_sword.play()
-                self.mostrar_flash_score(f'+{SCORE_ENEMY}')
-                self.mostrar_mensaje('Usaste una ESPADA: enemigo eliminado!')
-                continue
-            if j.armaduras > 0:
-                j.armaduras -= 1
-                if self.empujar_enemigo(e, pasos=2):
-                    self.mostrar_mensaje('Usaste ARMADURA: enemigo empujado!')
-                else:
-                    j.perder_corazon()
-                    if self.snd_hurt: self.snd_hurt.play()
-                    self.mostrar_mensaje(f'No se pudo empujar: perdiste un corazón ({j.corazones_llenos}/{j.corazones_totales})')
-                if j.corazones_llenos == 0:
-                    self.mostrar_mensaje('¡Has sido derrotado!')
-                    self.estado = 'gameover'
-                    try:
-                        pygame.mixer.music.fadeout(400)
-                    except Exception:
-                        pass
-                    self.play_gameover_music()
-                    return True
-                continue
-            j.perder_corazon()
-            if self.snd_hurt: self.snd_hurt.play()
-            self.mostrar_mensaje(f'¡Perdiste un corazón! ({j.corazones_llenos}/{j.corazones_totales})')
-            if j.corazones_llenos == 0:
-                self.mostrar_mensaje('¡Has sido derrotado!')
-                self.estado = 'gameover'
-                try:
-                    pygame.mixer.music.fadeout(400)
-                except Exception:
-                    pass
-                self.play_gameover_music()
-                return True
-        return False
-
-    def empujar_enemigo(self, enemigo, pasos=2):
-        dx = enemigo.ultimo_dx
-        dy = enemigo.ultimo_dy
-        if dx == 0 and dy == 0:
-            j = self.mapa_actual.jugador
-            dx = 1 if enemigo.x > j.x else -1 if enemigo.x < j.x else 0
-            dy = 1 if enemigo.y > j.y else -1 if enemigo.y < j.y else 0
-            dx *= -1
-            dy *= -1
-        final_x, final_y = enemigo.x, enemigo.y
-        for step in range(1, pasos + 1):
-            nx = enemigo.x + dx * step
-            ny = enemigo.y + dy * step
-            if 0 <= nx < self.mapa_actual.filas and 0 <= ny < self.mapa_actual.columnas:
-                if self.mapa_actual.base_matriz[nx][ny] in ('.', 'S'):
-                    final_x, final_y = nx, ny
-                else:
-                    break
-            else:
-                break
-        if (final_x, final_y) != (enemigo.x, enemigo.y):
-            enemigo.x, enemigo.y = final_x, final_y
-            return True
-        return False
-
-    def verificar_cofre(self):
-        j = self.mapa_actual.jugador
-        for c in self.mapa_actual.cofres:
-            if not c.abierto and j.x == c.x and j.y == c.y:
-                c.abierto = True
-                if self.snd_chest: self.snd_chest.play()
-                if c.contenido == 'armadura':
-                    j.armaduras += 1
-                    self.mostrar_mensaje('¡Cofre abierto! ARMADURA obtenida.')
-                elif c.contenido == 'espada':
-                    j.espadas += 1
-                    self.mostrar_mensaje('¡Cofre abierto! ESPADA obtenida.')
-                elif c.contenido == 'dinero':
-                    j.puntuacion += c.valor
-                    self.mostrar_mensaje(f'¡Cofre abierto! Dinero +{c.valor}. Puntos: {j.puntuacion}')
-                self.score_total += SCORE_ITEM
-                self.mostrar_flash_score(f'+{SCORE_ITEM}')
-                return True
-        return False
-
-    def verificar_portal(self):
-        j = self.mapa_actual.jugador
-        px, py = self.mapa_actual.portal
-        return j.x == px and j.y == py
-
-    def recargar_corazones(self, jugador, costo_por_corazon=100):
-        while jugador.corazones_llenos < jugador.corazones_totales and jugador.puntuacion >= costo_por_corazon:
-            jugador.puntuacion -= costo_por_corazon
-            jugador.corazones_llenos += 1
-
     # Render
     def dibujar(self):
         self.screen.fill(BLACK)
@@ -461,50 +697,56 @@ class Juego:
         start_j = max(0, math.floor((-offset_x) / self.tile_px))
         end_j = min(self.mapa_actual.columnas, math.ceil((SCREEN_WIDTH - offset_x) / self.tile_px))
 
-        for i in range(start_i, end_i):
-            for j in range(start_j, end_j):
-                if not self.mapa_actual.revelado[i][j]:
-                    continue
-                x = j * self.tile_px + offset_x
-                y = i * self.tile_px + offset_y
-                celda = self.mapa_actual.base_matriz[i][j]
-                if celda == '.':
-                    self.screen.blit(self.tex_floor, (x, y))
-                elif celda == 'S':
-                    self.screen.blit(self.tex_floor, (x, y))
-                    self.screen.blit(self.tex_portal, (x, y))
-                else:
-                    self.screen.blit(self.tex_wall, (x, y))
-
-        def dentro_view(i, j):
-            return start_i <= i < end_i and start_j <= j < end_j
-
-        for c in self.mapa_actual.cofres:
-            if not c.abierto and self.mapa_actual.revelado[c.x][c.y] and dentro_view(c.x, c.y):
-                cx = c.y * self.tile_px + offset_x
-                cy = c.x * self.tile_px + offset_y
-                self.screen.blit(self.tex_chest, (cx, cy))
-
-        for e in self.mapa_actual.enemigos:
-            if self.mapa_actual.revelado[e.x][e.y] and dentro_view(e.x, e.y):
-                ex = e.y * self.tile_px + offset_x
-                ey = e.x * self.tile_px + offset_y
-                self.screen.blit(self.tex_enemy, (ex, ey))
-
-        px = self.mapa_actual.jugador.y * self.tile_px + offset_x
-        py = self.mapa_actual.jugador.x * self.tile_px + offset_y
-        self.screen.blit(self.tex_player, (px, py))
-
-        self.dibujar_minimapa()
-        self.dibujar_hud()
-        pygame.display.flip()
+        # Terreno: bloques pre-renderizados (solo cambian al revelar celdas)
+        with self.perfil.seccion('terreno'):
+            if self.capa_terreno.mapa is not self.mapa_actual:
+                self.capa_terreno.reiniciar(self.mapa_actual)
+            self.capa_terreno.dibujar(self.screen, offset_x, offset_y, start_i, end_i, start_j, end_j)
+
+        with self.perfil.seccion('sprites'):
+            _, revelado_vista = self.mapa_actual.region(start_i, end_i, start_j, end_j)
+            # Solo las entidades de la vista, por el índice espacial del mapa
+            cofres_vista, enemigos_vista = self.mapa_actual.entidades_en_region(start_i, end_i, start_j, end_j)
+            for c in cofres_vista:
+                if revelado_vista[c.x - start_i, c.y - start_j]:
+                    cx = c.y * self.tile_px + offset_x
+                    cy = c.x * self.tile_px + offset_y
+                    self.screen.blit(self.tex_chest, (cx, cy))
+
+            for e in enemigos_vista:
+                if revelado_vista[e.x - start_i, e.y - start_j]:
+                    ex = e.y * self.tile_px + offset_x
+                    ey = e.x * self.tile_px + offset_y
+                    self.screen.blit(self.tex_enemy, (ex, ey))
+
+            px = self.mapa_actual.jugador.y * self.tile_px + offset_x
+            py = self.mapa_actual.jugador.x * self.tile_px + offset_y
+            self.screen.blit(self.tex_player, (px, py))
+
+        with self.perfil.seccion('minimapa'):
+            self.dibujar_minimapa()
+        with self.perfil.seccion('hud'):
+            self.dibujar_hud()
+
+    def ventana_minimapa(self):
+        """Rectángulo (i0, i1, j0, j1) del mapa que cubre el minimapa."""
+        mapa = self.mapa_actual
+        lado = mapa.ventana_minimapa
+        if lado is None:
+            return 0, mapa.filas, 0, mapa.columnas
+        # Mundos por chunks: ventana centrada en el jugador y pegada a los bordes
+        alto, ancho = min(lado, mapa.filas), min(lado, mapa.columnas)
+        i0 = min(max(0, mapa.jugador.x - alto // 2), mapa.filas - alto)
+        j0 = min(max(0, mapa.jugador.y - ancho // 2), mapa.columnas - ancho)
+        return i0, i0 + alto, j0, j0 + ancho
 
     def dibujar_minimapa(self):
         max_w = MINIMAP_MAX_W if isinstance(MINIMAP_MAX_W, (int, float)) else 220
         max_h = MINIMAP_MAX_H if isinstance(MINIMAP_MAX_H, (int, float)) else 180
         margin = MINIMAP_MARGIN if isinstance(MINIMAP_MARGIN, (int, float)) else 10
-        filas = self.mapa_actual.filas
-        columnas = self.mapa_actual.columnas
+        i0, i1, j0, j1 = self.ventana_minimapa()
+        filas = i1 - i0
+        columnas = j1 - j0
         tile_w = max_w / max(1, columnas)
         tile_h = max_h / max(1, filas)
         tile = int(max(3, min(tile_w, tile_h)))
@@ -515,70 +757,74 @@ class Juego:
         y0 = screen_h - margin - height
         if y0 < margin:
             y0 = margin
-        pygame.draw.rect(self.screen, (20, 20, 20), (x0, y0, width, height))
+        # Terreno: Surface persistente de 1 px por celda, escalada solo si cambió
+        self.screen.blit(self.minimapa.superficie(self.mapa_actual, (i0, i1, j0, j1), tile), (x0, y0))
         pygame.draw.rect(self.screen, YELLOW, (x0, y0, width, height), 3)
-        for i in range(filas):
-            for j in range(columnas):
-                cx = x0 + j * tile
-                cy = y0 + i * tile
-                if not self.mapa_actual.revelado[i][j]:
-                    pygame.draw.rect(self.screen, BLACK, (cx, cy, tile, tile))
-                else:
-                    celda = self.mapa_actual.base_matriz[i][j]
-                    if celda == '.':
-                        pygame.draw.rect(self.screen, (0, 140, 0), (cx, cy, tile, tile))
-                    elif celda == 'S':
-                        pygame.draw.rect(self.screen, PURPLE, (cx, cy, tile, tile))
-                    elif celda == ' ':
-                        pygame.draw.rect(self.screen, (60, 60, 60), (cx, cy, tile, tile))
-        for c in self.mapa_actual.cofres:
-            if not c.abierto and self.mapa_actual.revelado[c.x][c.y]:
-                cx = x0 + c.y * tile
-                cy = y0 + c.x * tile
+        cofres_vista, enemigos_vista = self.mapa_actual.entidades_en_region(i0, i1, j0, j1)
+        for c in cofres_vista:
+            if self.mapa_actual.esta_revelado(c.x, c.y):
+                cx = x0 + (c.y - j0) * tile
+                cy = y0 + (c.x - i0) * tile
                 pygame.draw.rect(self.screen, BROWN, (cx, cy, tile, tile))
-        for e in self.mapa_actual.enemigos:
-            if self.mapa_actual.revelado[e.x][e.y]:
-                ex = x0 + e.y * tile
-                ey = y0 + e.x * tile
+        for e in enemigos_vista:
+            if self.mapa_actual.esta_revelado(e.x, e.y):
+                ex = x0 + (e.y - j0) * tile
+                ey = y0 + (e.x - i0) * tile
                 pygame.draw.rect(self.screen, RED, (ex, ey, tile, tile))
-        px = x0 + self.mapa_actual.jugador.y * tile
-        py = y0 + self.mapa_actual.jugador.x * tile
+        px = x0 + (self.mapa_actual.jugador.y - j0) * tile
+        py = y0 + (self.mapa_actual.jugador.x - i0) * tile
         pygame.draw.rect(self.screen, BLUE, (px, py, tile, tile))
 
-    def dibujar_hud(self):
+    def componer_hud(self):
+        """Surface con íconos y textos del HUD; solo se rehace si cambia algún valor."""
         j = self.mapa_actual.jugador
-        # Íconos arriba-izquierda
-        base_x, base_y = 10, 10
+        clave = (j.corazones_llenos >= 1, j.corazones_llenos >= 2, j.armaduras > 0, j.espadas > 0,
+                 j.movimientos, j.x, j.y, self.mapa_actual.filas, self.mapa_actual.columnas, self.pista_portal)
+        if clave == self.hud_clave:
+            return self.hud_superficie
         spacing = 30
+        textos = [
+            self.textos.render(self.font, f'Movimientos: {j.movimientos}', WHITE),
+            self.textos.render(self.font, f'Posición: ({j.x}, {j.y})', WHITE),
+            self.textos.render(self.font, f'Mapa: {self.mapa_actual.filas}x{self.mapa_actual.columnas}', WHITE),
+            self.textos.render(self.font, f'Pista portal: {self.pista_portal}', YELLOW),
+        ]
+        ancho = max([spacing * 3 + self.hud_sword_on.get_width()] + [t.get_width() for t in textos])
+        alto = 35 + 28 * (len(textos) - 1) + max(t.get_height() for t in textos)
+        hud = pygame.Surface((ancho, alto), pygame.SRCALPHA)
+        # Íconos arriba
         heart1 = self.hud_heart_full if j.corazones_llenos >= 1 else self.hud_heart_empty
         heart2 = self.hud_heart_full if j.corazones_llenos >= 2 else self.hud_heart_empty
-        self.screen.blit(heart1, (base_x, base_y))
-        self.screen.blit(heart2, (base_x + spacing, base_y))
+        hud.blit(heart1, (0, 0))
+        hud.blit(heart2, (spacing, 0))
         armor_icon = self.hud_armor_on if j.armaduras > 0 else self.hud_armor_off
-        self.screen.blit(armor_icon, (base_x + spacing*2, base_y))
+        hud.blit(armor_icon, (spacing*2, 0))
         sword_icon = self.hud_sword_on if j.espadas > 0 else self.hud_sword_off
-        self.screen.blit(sword_icon, (base_x + spacing*3, base_y))
+        hud.blit(sword_icon, (spacing*3, 0))
         # Textos (debajo)
-        tx, ty = 10, base_y + 35
-        movs_texto = self.font.render(f'Movimientos: {j.movimientos}', True, WHITE)
-        self.screen.blit(movs_texto, (tx, ty))
-        pos_texto = self.font.render(f'Posición: ({j.x}, {j.y})', True, WHITE)
-        self.screen.blit(pos_texto, (tx, ty + 28))
-        mapa_texto = self.font.render(f'Mapa: {self.mapa_actual.filas}x{self.mapa_actual.columnas}', True, WHITE)
-        self.screen.blit(mapa_texto, (tx, ty + 56))
-        pista_texto = self.font.render(f'Pista portal: {self.pista_portal}', True, YELLOW)
-        self.screen.blit(pista_texto, (tx, ty + 84))
+        for k, texto in enumerate(textos):
+            hud.blit(texto, (0, 35 + 28 * k))
+        self.hud_superficie = hud
+        self.hud_clave = clave
+        return hud
+
+    def dibujar_hud(self):
+        # Íconos y textos arriba-izquierda
+        self.screen.blit(self.componer_hud(), (10, 10))
         # Puntaje arriba-derecha
-        puntaje_total_surface = self.font.render(f'Puntaje: {self.score_total}', True, WHITE)
+        puntaje_total_surface = self.textos.render(self.font, f'Puntaje: {self.score_total}', WHITE)
         right_x = SCREEN_WIDTH - puntaje_total_surface.get_width() - 10
         self.screen.blit(puntaje_total_surface, (right_x, 10))
         # Mensaje temporal & flash
         if self.mensaje:
-            msg_surface = self.font.render(self.mensaje, True, YELLOW)
+            msg_surface = self.textos.render(self.font, self.mensaje, YELLOW)
             msg_rect = msg_surface.get_rect(center=(SCREEN_WIDTH // 2, 30))
             self.screen.blit(msg_surface, msg_rect)
+            self.rect_mensaje = msg_rect
         if self.flash_score_text:
-            flash_surface = self.font.render(self.flash_score_text, True, WHITE)
+            flash_surface = self.textos.render(self.font, self.flash_score_text, WHITE)
             flash_rect = flash_surface.get_rect(center=(SCREEN_WIDTH // 2, 60))
-            pygame.draw.rect(self.screen, (0, 0, 0), (flash_rect.x - 6, flash_rect.y - 2, flash_rect.width + 12, flash_rect.height + 4))
+            fondo_flash = pygame.Rect(flash_rect.x - 6, flash_rect.y - 2, flash_rect.width + 12, flash_rect.height + 4)
+            pygame.draw.rect(self.screen, (0, 0, 0), fondo_flash)
             self.screen.blit(flash_surface, flash_rect)
+            self.rect_flash = fondo_flash
@@ -1,110 +1,231 @@
 # Clase Mapa con progresión de dificultad
-import random
-from collections import deque
-from entidades import Personaje, Enemigo, Cofre
-from config import VISIBLE_RADIUS
+from functools import lru_cache
+import numpy as np
+from entidades import Personaje, CONTENIDOS, sortear_cofres
+from almacen_entidades import AlmacenEntidades
+from config import VISIBLE_RADIUS, ENEMY_SPAWN_MIN_DIST
+from celdas import MURO, SUELO, PORTAL, TRANSITABLE
+from distancias import CampoDistancias
+
+# Subir cuando cambie el resultado de generar_mapa para una misma semilla
+# (invalida los niveles guardados en cache_niveles)
+VERSION_GENERADOR = 5
+
+
+def nivel_estimado(filas, columnas):
+    return max(1, max(filas, columnas) - 15)
+
+
+def prob_suelo_nivel(nivel_est):
+    # Más muros con el nivel: baja probabilidad de suelo
+    return max(0.45, 0.72 - 0.03 * (nivel_est - 1))
+
+
+@lru_cache(maxsize=None)
+def disco(radio):
+    """Máscara booleana (2r+1)x(2r+1) de las celdas con dx*dx + dy*dy <= r*r (solo lectura)."""
+    d = np.arange(-radio, radio + 1)
+    mascara = d[:, None] ** 2 + d[None, :] ** 2 <= radio * radio
+    mascara.setflags(write=False)
+    return mascara
+
 
 class Mapa:
+    # Celdas por lado que muestra el minimapa (None = el mapa completo)
+    ventana_minimapa = None
+
     def __init__(self, filas, columnas, seed=None):
         self.filas = filas
         self.columnas = columnas
-        self.base_matriz = [[' ' for _ in range(columnas)] for _ in range(filas)]
-        self.revelado = [[False for _ in range(columnas)] for _ in range(filas)]
+        # Códigos uint8 (ver celdas.py) y máscara booleana de celdas reveladas
+        self.base_matriz = np.full((filas, columnas), MURO, dtype=np.uint8)
+        self.revelado = np.zeros((filas, columnas), dtype=bool)
         self.jugador = None
-        self.enemigos = []
-        self.cofres = []
+        # Enemigos y cofres en arrays (ver almacen_entidades.py)
+        self.entidades = AlmacenEntidades()
         self.portal = None
-        if seed is not None:
-            random.seed(seed)
+        # RNG propio del mapa: la misma semilla da el mismo nivel sin tocar el RNG global
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.campo = None
+        self.campo_flujo = None
+        # Bloque de memoria compartida que respalda base_matriz (ver pregeneracion.py)
+        self.memoria_compartida = None
 
     def generar_mapa(self):
-        nivel_est = max(self.filas, self.columnas) - 15
-        if nivel_est < 1: nivel_est = 1
-        # Más muros con el nivel: baja probabilidad de suelo
-        prob_suelo = max(0.45, 0.72 - 0.03 * (nivel_est - 1))
-        intentos_max = 10
+        nivel_est = nivel_estimado(self.filas, self.columnas)
+        prob_suelo = prob_suelo_nivel(nivel_est)
         min_dist_portal = min(10 + nivel_est, (self.filas + self.columnas) // 2)
         cx, cy = self.filas // 2, self.columnas // 2
-        exito = False
-        for _ in range(intentos_max):
-            self._generar_terreno(prob_suelo)
-            self.base_matriz[cx][cy] = '.'
-            self.jugador = Personaje(cx, cy)
-            alcanzables, dist = self._alcanzables_desde((cx, cy))
-            if not alcanzables:
-                continue
-            portal = self._elegir_portal(alcanzables, dist, min_dist=min_dist_portal)
-            if portal is None:
-                portal = max(alcanzables, key=lambda p: dist[p])
-            px, py = portal
-            self.base_matriz[px][py] = 'S'
-            self.portal = (px, py)
-            alcanzables, dist = self._alcanzables_desde((cx, cy))
-            if (px, py) not in alcanzables:
-                continue
-            self._colocar_entidades(alcanzables, jugador=(cx, cy), portal=(px, py), nivel=nivel_est)
-            self.revelar_area(cx, cy, VISIBLE_RADIUS)
-            exito = True
-            break
-        if not exito:
-            self._generar_terreno(prob_suelo)
-            self.base_matriz[cx][cy] = '.'
-            self.jugador = Personaje(cx, cy)
-            esquina = self._esquina_mas_lejana(cx, cy)
-            px, py = esquina
-            self._carvar_camino((cx, cy), (px, py))
-            self.base_matriz[px][py] = 'S'
-            self.portal = (px, py)
-            alcanzables, _ = self._alcanzables_desde((cx, cy))
-            self._colocar_entidades(alcanzables, jugador=(cx, cy), portal=(px, py), nivel=nivel_est)
-            self.revelar_area(cx, cy, VISIBLE_RADIUS)
+        # Una sola pasada de terreno: las cuevas grandes se unen a la del jugador,
+        # así que no hace falta reintentar aunque prob_suelo baje hacia 0.45
+        self._generar_terreno(prob_suelo)
+        self.base_matriz[cx, cy] = SUELO
+        self.jugador = Personaje(cx, cy)
+        self._conectar_componentes((cx, cy))
+        # El terreno ya es definitivo: el campo de distancias se crea sobre él
+        self.campo = None
+        alcanzables, dist = self._alcanzables_desde((cx, cy))
+        portal = self._elegir_portal(alcanzables, dist, min_dist=min_dist_portal)
+        if portal is None:
+            # El último en orden BFS es el más lejano
+            portal = divmod(int(alcanzables[-1]), self.columnas)
+        px, py = portal
+        self.base_matriz[px, py] = PORTAL
+        self.portal = (px, py)
+        self._colocar_entidades(alcanzables, dist, jugador=(cx, cy), portal=(px, py), nivel=nivel_est,
+                                dist_min_jugador=ENEMY_SPAWN_MIN_DIST)
+        self.revelar_area(cx, cy, VISIBLE_RADIUS)
 
     def revelar_area(self, x, y, radio):
-        r2 = radio * radio
-        for i in range(max(0, x - radio), min(self.filas, x + radio + 1)):
-            for j in range(max(0, y - radio), min(self.columnas, y + radio + 1)):
-                dx = x - i
-                dy = y - j
-                if dx*dx + dy*dy <= r2:
-                    self.revelado[i][j] = True
+        """Revela un disco de radio `radio` con un sello precalculado.
+
+        Devuelve (xs, ys): arrays con las celdas que no estaban reveladas,
+        para que render y minimapa se actualicen solo donde cambió algo.
+        """
+        sello = disco(radio)
+        i0, i1 = max(0, x - radio), min(self.filas, x + radio + 1)
+        j0, j1 = max(0, y - radio), min(self.columnas, y + radio + 1)
+        sello = sello[i0 - (x - radio):i1 - (x - radio), j0 - (y - radio):j1 - (y - radio)]
+        zona = self.revelado[i0:i1, j0:j1]
+        xs, ys = np.nonzero(sello & ~zona)
+        zona |= sello
+        return xs + i0, ys + j0
+
+    @property
+    def enemigos(self):
+        """Lista de vistas Enemigo de los enemigos vivos."""
+        return self.entidades.enemigos()
+
+    @property
+    def cofres(self):
+        return self.entidades.cofres()
+
+    def mover_enemigos(self, jugador):
+        """Paso de persecución de todos los enemigos (vectorizado)."""
+        return self.entidades.mover_enemigos(self, jugador, jugador.movimientos)
+
+    def quitar_enemigo(self, enemigo):
+        self.entidades.quitar_enemigo(enemigo.id)
+
+    def colocar_enemigo(self, enemigo, x, y):
+        self.entidades.colocar_enemigo(enemigo.id, x, y)
+
+    def abrir_cofre(self, cofre):
+        self.entidades.abrir_cofre(cofre.id)
+
+    # Consultas del índice espacial (ver AlmacenEntidades)
+    def enemigos_en(self, x, y):
+        return self.entidades.enemigos_en(x, y)
+
+    def cofre_en(self, x, y):
+        return self.entidades.cofre_en(x, y)
+
+    def entidades_en_region(self, i0, i1, j0, j1):
+        """(cofres cerrados, enemigos) dentro del rectángulo [i0, i1) x [j0, j1)."""
+        return self.entidades.en_region(i0, i1, j0, j1)
 
     def _generar_terreno(self, prob_suelo: float):
-        for i in range(self.filas):
-            fila = self.base_matriz[i]
-            for j in range(self.columnas):
-                fila[j] = '.' if random.random() < prob_suelo else ' '
+        suelo = self.rng.random((self.filas, self.columnas)) < prob_suelo
+        self.base_matriz[...] = np.where(suelo, SUELO, MURO)
+
+    def region(self, i0, i1, j0, j1):
+        """(celdas, revelado) del rectángulo [i0, i1) x [j0, j1), ya recortado a los límites."""
+        return self.base_matriz[i0:i1, j0:j1], self.revelado[i0:i1, j0:j1]
+
+    def esta_revelado(self, x, y):
+        return bool(self.revelado[x, y])
+
+    def empaquetar(self):
+        """Datos pequeños del nivel generado (sin la matriz), fáciles de enviar entre procesos."""
+        return {
+            'filas': self.filas,
+            'columnas': self.columnas,
+            'seed': self.seed,
+            'jugador': (self.jugador.x, self.jugador.y),
+            'portal': self.portal,
+            'enemigos': [(e.x, e.y, e.vision) for e in self.enemigos],
+            'cofres': [(c.x, c.y, c.contenido, c.valor) for c in self.cofres],
+        }
+
+    @classmethod
+    def desde_paquete(cls, paquete, base_matriz):
+        """Reconstruye un nivel generado a partir de empaquetar() y su matriz.
+
+        La matriz se usa tal cual (sin copiar): puede ser una vista sobre
+        memoria compartida o un fichero mapeado.
+        """
+        mapa = cls(paquete['filas'], paquete['columnas'], paquete['seed'])
+        mapa.base_matriz = base_matriz
+        mapa.jugador = Personaje(*paquete['jugador'])
+        mapa.portal = tuple(paquete['portal'])
+        if paquete['enemigos']:
+            xs, ys, visiones = zip(*paquete['enemigos'])
+            mapa.entidades.agregar_enemigos(xs, ys, visiones)
+        if paquete['cofres']:
+            xs, ys, contenidos, valores = zip(*paquete['cofres'])
+            mapa.entidades.agregar_cofres(xs, ys, [CONTENIDOS.index(c) for c in contenidos], valores)
+        mapa.revelar_area(mapa.jugador.x, mapa.jugador.y, VISIBLE_RADIUS)
+        return mapa
+
+    def distancias_desde(self, *fuentes):
+        """Distancias BFS (int32, -1 si inalcanzable) desde una o varias celdas (x, y).
+
+        Reutiliza el mismo CampoDistancias entre llamadas; la matriz devuelta
+        es una vista que cambia en la siguiente llamada.
+        """
+        if self.campo is None:
+            self.campo = CampoDistancias(TRANSITABLE[self.base_matriz])
+        return self.campo.calcular(fuentes)
+
+    def flujo_hacia(self, x, y, radio, objetivos=None):
+        """Campo de distancias BFS hacia (x, y) dentro de la ventana de lado 2*radio+1.
+
+        Devuelve (dist, i0, j0): dist es la matriz de la ventana (-1 si no se
+        llega sin salir de ella) e (i0, j0) su esquina en el mapa. Los
+        enemigos bajan por este campo; se calcula una vez por turno para todos.
+        Con `objetivos` (celdas del mapa) la BFS para en cuanto los alcanza a
+        todos (ver CampoDistancias.calcular).
+        """
+        i0, j0 = max(0, x - radio), max(0, y - radio)
+        celdas, _ = self.region(i0, x + radio + 1, j0, y + radio + 1)
+        if self.campo_flujo is None:
+            self.campo_flujo = CampoDistancias(TRANSITABLE[celdas])
+        else:
+            self.campo_flujo.preparar(TRANSITABLE[celdas])
+        if objetivos is not None:
+            objetivos = [(ox - i0, oy - j0) for ox, oy in objetivos]
+        return self.campo_flujo.calcular([(x - i0, y - j0)], objetivos), i0, j0
 
     def _alcanzables_desde(self, inicio):
-        si, sj = inicio
-        if not self._es_transitable(si, sj):
-            return set(), {}
-        visitados = set()
-        dist = {}
-        q = deque([(si, sj)])
-        visitados.add((si, sj))
-        dist[(si, sj)] = 0
-        while q:
-            x, y = q.popleft()
-            for nx, ny in ((x-1,y),(x+1,y),(x,y-1),(x,y+1)):
-                if self._en_limites(nx, ny) and self._es_transitable(nx, ny) and (nx, ny) not in visitados:
-                    visitados.add((nx, ny))
-                    dist[(nx, ny)] = dist[(x, y)] + 1
-                    q.append((nx, ny))
-        return visitados, dist
+        """Devuelve (alcanzables, dist): índices planos en orden BFS y distancias planas."""
+        self.distancias_desde(inicio)
+        return self.campo.alcanzables, self.campo.distancias.ravel()
 
     def _elegir_portal(self, alcanzables, dist, min_dist=5):
-        candidatos = [p for p in alcanzables if dist.get(p, 0) >= min_dist]
-        if not candidatos:
+        """Elige al azar entre el 25% más lejano de los alcanzables a >= min_dist.
+
+        `alcanzables` viene en orden BFS (distancia no decreciente), así que el
+        cuarto más lejano son simplemente los últimos candidatos: sin ordenar.
+        """
+        candidatos = alcanzables[dist[alcanzables] >= min_dist]
+        if candidatos.size == 0:
             return None
-        candidatos.sort(key=lambda p: dist[p], reverse=True)
         top = max(1, len(candidatos)//4)
-        return random.choice(candidatos[:top])
+        elegido = candidatos[len(candidatos) - 1 - self.rng.integers(top)]
+        return divmod(int(elegido), self.columnas)
+
+    def _colocar_entidades(self, alcanzables, dist, jugador, portal, nivel, dist_min_jugador=0):
+        """Sortea sin reemplazo las celdas de enemigos y cofres entre las alcanzables.
 
-    def _colocar_entidades(self, alcanzables, jugador, portal, nivel):
-        disponibles = set(alcanzables)
-        disponibles.discard(jugador)
-        disponibles.discard(portal)
-        if not disponibles:
+        Con dist_min_jugador > 0 los enemigos solo aparecen a esa distancia BFS
+        o más del jugador (si no hay celdas suficientes, se ignora el límite).
+        """
+        # Máscaras sobre el orden BFS, que ya es estable para una semilla: O(n)
+        # en las alcanzables, sin ordenarlas
+        disponibles = alcanzables[(alcanzables != jugador[0] * self.columnas + jugador[1])
+                                  & (alcanzables != portal[0] * self.columnas + portal[1])]
+        if disponibles.size == 0:
             return
         area = self.filas * self.columnas
         # Enemigos: aumentan con nivel y tamaño
@@ -117,33 +238,123 @@ class Mapa:
         cofres_nivel = base_cofres + max(0, nivel//3) + max(0, area//280)
         cofres_max = max(4, area//50)
         num_cofres = min(cofres_nivel, cofres_max, max(0, len(disponibles) - num_enemigos))
+        lejanas = np.flatnonzero(dist[disponibles] >= dist_min_jugador)
+        if dist_min_jugador <= 0 or lejanas.size < num_enemigos:
+            # Un solo sorteo sin reemplazo: los primeros son enemigos y el resto cofres
+            elegidas = self.rng.choice(disponibles, num_enemigos + num_cofres, replace=False)
+            celdas_enemigos, celdas_cofres = elegidas[:num_enemigos], elegidas[num_enemigos:]
+        else:
+            # Enemigos entre las lejanas; los cofres, en lo que quede libre
+            elegidas = self.rng.choice(lejanas, num_enemigos, replace=False)
+            libres = np.ones(disponibles.size, dtype=bool)
+            libres[elegidas] = False
+            celdas_enemigos = disponibles[elegidas]
+            celdas_cofres = self.rng.choice(disponibles[libres], num_cofres, replace=False)
         # Colocar enemigos
-        for _ in range(num_enemigos):
-            x, y = random.choice(tuple(disponibles))
-            disponibles.remove((x, y))
-            e = Enemigo(x, y)
-            e.vision = min(10, 4 + nivel//2)
-            self.enemigos.append(e)
+        vision = min(10, 4 + nivel//2)
+        self.entidades.agregar_enemigos(*np.divmod(celdas_enemigos, self.columnas), vision)
         # Colocar cofres
-        for _ in range(num_cofres):
-            x, y = random.choice(tuple(disponibles))
-            disponibles.remove((x, y))
-            self.cofres.append(Cofre(x, y))
+        self.entidades.agregar_cofres(*np.divmod(celdas_cofres, self.columnas),
+                                      *sortear_cofres(self.rng, len(celdas_cofres)))
 
-    def _carvar_camino(self, origen, destino):
+    def _etiquetar_componentes(self):
+        """Etiqueta las regiones transitables conectadas (vecindad 4).
+
+        Devuelve (etiquetas, tamaños): etiquetas es una matriz int32 con -1 en
+        los muros y 0..k-1 en el suelo; tamaños[k] es el número de celdas de k.
+        Usa unión de raíces + salto de punteros sobre todas las aristas a la
+        vez, así que el coste es O(celdas) en numpy y no un BFS por región.
+        """
+        transitable = TRANSITABLE[self.base_matriz]
+        n = self.filas * self.columnas
+        idx = np.arange(n, dtype=np.int64).reshape(self.filas, self.columnas)
+        horiz = transitable[:, :-1] & transitable[:, 1:]
+        vert = transitable[:-1, :] & transitable[1:, :]
+        u = np.concatenate((idx[:, :-1][horiz], idx[:-1, :][vert]))
+        v = np.concatenate((idx[:, 1:][horiz], idx[1:, :][vert]))
+        raiz = np.arange(n, dtype=np.int64)
+        while True:
+            ru, rv = raiz[u], raiz[v]
+            distintas = ru != rv
+            if not distintas.any():
+                break
+            ru, rv = ru[distintas], rv[distintas]
+            # Cada raíz cuelga de la menor raíz vecina; al decrecer nunca hay ciclos
+            np.minimum.at(raiz, np.maximum(ru, rv), np.minimum(ru, rv))
+            while True:
+                siguiente = raiz[raiz]
+                if np.array_equal(siguiente, raiz):
+                    break
+                raiz = siguiente
+        plano = transitable.ravel()
+        etiquetas = np.full(n, -1, dtype=np.int32)
+        _, compactas, tamanos = np.unique(raiz[plano], return_inverse=True, return_counts=True)
+        etiquetas[plano] = compactas
+        return etiquetas.reshape(self.filas, self.columnas), tamanos
+
+    def _conectar_componentes(self, inicio, tam_min=6):
+        """Une a la región de `inicio` toda región con al menos tam_min celdas.
+
+        Las regiones se procesan de la más cercana a la más lejana; cada una
+        excava un pasillo en L desde su celda más próxima a `inicio` que se
+        detiene al tocar suelo ya conectado, así la red crece hacia fuera y
+        los pasillos quedan cortos.
+        """
+        etiquetas, tamanos = self._etiquetar_componentes()
+        if len(tamanos) <= 1:
+            return
+        sx, sy = inicio
+        plano = etiquetas.ravel()
+        celdas = np.flatnonzero(plano >= 0)
+        de_celda = plano[celdas]
+        xs, ys = np.divmod(celdas, self.columnas)
+        cercania = np.abs(xs - sx) + np.abs(ys - sy)
+        # Celda más próxima a `inicio` de cada región (primera de su grupo)
+        orden = np.lexsort((cercania, de_celda))
+        primeras = orden[np.searchsorted(de_celda[orden], np.arange(len(tamanos)))]
+        conectadas = np.zeros(len(tamanos), dtype=bool)
+        conectadas[etiquetas[inicio]] = True
+        for k in np.argsort(cercania[primeras], kind='stable'):
+            if conectadas[k] or tamanos[k] < tam_min:
+                continue
+            origen = (int(xs[primeras[k]]), int(ys[primeras[k]]))
+            for etiqueta in self._carvar_hacia(origen, inicio, etiquetas, conectadas):
+                conectadas[etiqueta] = True
+
+    def _carvar_hacia(self, origen, destino, etiquetas, conectadas):
+        """Excava en L de origen a destino hasta tocar una región conectada.
+
+        Devuelve las etiquetas de las regiones atravesadas por el pasillo.
+        """
         ox, oy = origen
         dx, dy = destino
+        inicial = etiquetas[ox, oy]
+        atravesadas = {inicial}
         step_x = 1 if dx > ox else -1
-        for x in range(ox, dx + step_x, step_x):
-            self.base_matriz[x][oy] = '.'
         step_y = 1 if dy > oy else -1
-        for y in range(oy, dy + step_y, step_y):
-            self.base_matriz[dx][y] = '.'
+        camino = [(x, oy) for x in range(ox, dx + step_x, step_x)]
+        camino += [(dx, y) for y in range(oy + step_y, dy + step_y, step_y)]
+        for x, y in camino:
+            etiqueta = etiquetas[x, y]
+            if etiqueta >= 0 and conectadas[etiqueta]:
+                break
+            if etiqueta >= 0:
+                atravesadas.add(etiqueta)
+            else:
+                self.base_matriz[x, y] = SUELO
+        return atravesadas
 
-    def _esquina_mas_lejana(self, x, y):
-        esquinas = [(0,0),(0,self.columnas-1),(self.filas-1,0),(self.filas-1,self.columnas-1)]
-        return max(esquinas, key=lambda p: abs(p[0]-x)+abs(p[1]-y))
     def _en_limites(self, x, y):
         return 0 <= x < self.filas and 0 <= y < self.columnas
-    def _es_transitable(self, x, y):
-        return self.base_matriz[x][y] in ('.','S')
+
+    def transitables(self, xs, ys):
+        """Versión vectorizada de es_transitable para arrays de coordenadas."""
+        dentro = (xs >= 0) & (xs < self.filas) & (ys >= 0) & (ys < self.columnas)
+        ok = np.zeros(len(xs), dtype=bool)
+        ok[dentro] = TRANSITABLE[self.base_matriz[xs[dentro], ys[dentro]]]
+        return ok
+
+    def es_transitable(self, x, y):
+        """True si (x, y) está dentro del mapa y la celda se puede pisar."""
+        return 0 <= x < self.filas and 0 <= y < self.columnas and bool(TRANSITABLE[self.base_matriz.item(x, y)])
+
@@ -0,0 +1,288 @@
+# Mapa por chunks generados bajo demanda (mundos muy grandes)
+#
+# El terreno se divide en chunks de CHUNK_SIZE x CHUNK_SIZE celdas. Cada chunk
+# se genera la primera vez que se consulta, con una semilla derivada de
+# (seed del mundo, fila del chunk, columna del chunk), así que no depende del
+# orden de exploración. Solo se mantienen en memoria CHUNK_MAX_LOADED chunks:
+# al pasarse se expulsa a disco el más lejano al chunk del jugador (en empate,
+# el usado hace más tiempo) y se vuelve a cargar al pisarlo otra vez.
+#
+# Entidades: un chunk recibe sus enemigos y cofres cuando el jugador pisa
+# ese chunk o uno vecino (revelar_area, que la simulación llama en cada paso),
+# nunca al leerlo para dibujar. Así las entidades y sus ids dependen solo del
+# recorrido del jugador y no de lo que se haya dibujado.
+#
+# Conectividad: cada chunk excava una fila y una columna completas (la
+# "espina") que coinciden con las de sus vecinos, de modo que todas las
+# espinas forman una red conectada. Jugador y portal se colocan en cruces de
+# la red y las cuevas grandes de cada chunk se unen a su cruce.
+import shutil
+import tempfile
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+
+from entidades import Personaje, sortear_cofres
+from almacen_entidades import AlmacenEntidades
+from config import VISIBLE_RADIUS, ENEMY_SPAWN_MIN_DIST, CHUNK_SIZE, CHUNK_MAX_LOADED
+from celdas import SUELO, PORTAL, TRANSITABLE
+from mapa import Mapa, nivel_estimado, prob_suelo_nivel, disco
+
+# Densidad de entidades por celda (la misma que Mapa en mapas grandes)
+ENEMIGOS_POR_CELDA = 1 / 220
+COFRES_POR_CELDA = 1 / 280
+
+
+class Chunk:
+    def __init__(self, celdas, revelado):
+        self.celdas = celdas
+        self.revelado = revelado
+
+
+class MapaChunks:
+    """Misma interfaz de consulta que Mapa, con el terreno troceado y perezoso."""
+
+    # Celdas por lado que muestra el minimapa (el mundo completo no cabe)
+    ventana_minimapa = 96
+
+    def __init__(self, filas, columnas, seed=None, tam_chunk=CHUNK_SIZE, max_cargados=CHUNK_MAX_LOADED,
+                 directorio=None):
+        self.filas = filas
+        self.columnas = columnas
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy % (2**32))
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.tam_chunk = tam_chunk
+        self.max_cargados = max(1, max_cargados)
+        self.jugador = None
+        self.entidades = AlmacenEntidades()
+        self.campo_flujo = None
+        self.portal = None
+        self.nivel_est = nivel_estimado(filas, columnas)
+        self.prob_suelo = prob_suelo_nivel(self.nivel_est)
+        self._cargados = OrderedDict()   # (ci, cj) -> Chunk, en orden de uso (desempata la expulsión)
+        self._en_disco = set()           # chunks expulsados a disco
+        self._generados = set()          # chunks que ya tienen sus entidades
+        if directorio is None:
+            directorio = tempfile.mkdtemp(prefix='mapa_chunks_')
+            weakref.finalize(self, shutil.rmtree, directorio, True)
+        self.directorio = Path(directorio)
+
+    # --- Geometría de la red de espinas ---
+    def _alto(self, ci):
+        return min(self.tam_chunk, self.filas - ci * self.tam_chunk)
+
+    def _ancho(self, cj):
+        return min(self.tam_chunk, self.columnas - cj * self.tam_chunk)
+
+    def _cruce(self, ci, cj):
+        """Celda global donde se cruzan la fila y la columna espina del chunk."""
+        t = self.tam_chunk
+        return ci * t + min(t // 2, self._alto(ci) - 1), cj * t + min(t // 2, self._ancho(cj) - 1)
+
+    def generar_mapa(self):
+        t = self.tam_chunk
+        n_ci = -(-self.filas // t)
+        n_cj = -(-self.columnas // t)
+        ci0, cj0 = (self.filas // 2) // t, (self.columnas // 2) // t
+        jx, jy = self._cruce(ci0, cj0)
+        self.jugador = Personaje(jx, jy)
+        # Portal en el cruce de un chunk lejano, elegido con el RNG del mundo
+        min_dist_portal = min(10 + self.nivel_est, (self.filas + self.columnas) // 2)
+        cruces = [self._cruce(ci, cj) for ci in range(n_ci) for cj in range(n_cj)]
+        lejanos = [c for c in cruces if abs(c[0] - jx) + abs(c[1] - jy) >= min_dist_portal]
+        if not lejanos:
+            lejanos = [max(cruces, key=lambda c: abs(c[0] - jx) + abs(c[1] - jy))]
+        self.portal = lejanos[self.rng.integers(len(lejanos))]
+        self.revelar_area(jx, jy, VISIBLE_RADIUS)
+
+    # --- Gestión de chunks ---
+    def _ruta(self, ci, cj):
+        return self.directorio / f'{ci}_{cj}.npz'
+
+    def _chunk(self, ci, cj):
+        clave = (ci, cj)
+        chunk = self._cargados.get(clave)
+        if chunk is not None:
+            self._cargados.move_to_end(clave)
+            return chunk
+        if clave in self._en_disco:
+            with np.load(self._ruta(ci, cj)) as datos:
+                celdas = datos['celdas']
+                revelado = np.unpackbits(datos['revelado'], count=celdas.size).astype(bool).reshape(celdas.shape)
+            chunk = Chunk(celdas, revelado)
+        else:
+            chunk = self._generar_chunk(ci, cj)
+        # Se expulsa antes de meter el nuevo para no expulsar el que se acaba de pedir
+        while len(self._cargados) >= self.max_cargados:
+            victima = self._mas_lejano()
+            self._expulsar(victima, self._cargados.pop(victima))
+        self._cargados[clave] = chunk
+        return chunk
+
+    def _mas_lejano(self):
+        """Clave del chunk cargado más lejano (en chunks) al del jugador; el menos usado si empatan."""
+        if self.jugador is None:
+            return next(iter(self._cargados))
+        t = self.tam_chunk
+        ji, jj = self.jugador.x // t, self.jugador.y // t
+        # max() se queda con el primero de los empatados, que es el menos usado
+        return max(self._cargados, key=lambda c: max(abs(c[0] - ji), abs(c[1] - jj)))
+
+    def _expulsar(self, clave, chunk):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        np.savez(self._ruta(*clave), celdas=chunk.celdas, revelado=np.packbits(chunk.revelado))
+        self._en_disco.add(clave)
+
+    def chunks_poblados(self):
+        """Claves (ci, cj), ordenadas, de los chunks que ya recibieron sus entidades."""
+        return sorted(self._generados)
+
+    def revelado_chunk(self, ci, cj):
+        """Máscara de celdas reveladas del chunk (la propia, no una copia)."""
+        return self._chunk(ci, cj).revelado
+
+    def restaurar_chunk(self, ci, cj, revelado):
+        """Marca el chunk como poblado (sus entidades vienen de fuera) y fija su máscara revelada."""
+        self._generados.add((ci, cj))
+        self._chunk(ci, cj).revelado[...] = revelado
+
+    def _generar_chunk(self, ci, cj):
+        local = self._mapa_local(ci, cj)
+        return Chunk(local.base_matriz, np.zeros((local.filas, local.columnas), dtype=bool))
+
+    def _mapa_local(self, ci, cj):
+        """Terreno del chunk como un Mapa pequeño con su propia semilla (sin entidades)."""
+        t = self.tam_chunk
+        alto, ancho = self._alto(ci), self._ancho(cj)
+        # Se reutiliza el generador de Mapa sobre el chunk, con su propia semilla
+        local = Mapa(alto, ancho, seed=[self.seed, ci, cj])
+        local._generar_terreno(self.prob_suelo)
+        ri, rj = min(t // 2, alto - 1), min(t // 2, ancho - 1)
+        local.base_matriz[ri, :] = SUELO
+        local.base_matriz[:, rj] = SUELO
+        local._conectar_componentes((ri, rj))
+        oi, oj = ci * t, cj * t
+        px, py = self.portal
+        if oi <= px < oi + alto and oj <= py < oj + ancho:
+            local.base_matriz[px - oi, py - oj] = PORTAL
+        return local
+
+    def _poblar_alrededor(self, x, y):
+        """Pone las entidades del chunk de (x, y) y de sus 8 vecinos que aún no las tengan."""
+        t = self.tam_chunk
+        for ci in range(max(0, x // t - 1), min(-(-self.filas // t), x // t + 2)):
+            for cj in range(max(0, y // t - 1), min(-(-self.columnas // t), y // t + 2)):
+                if (ci, cj) not in self._generados:
+                    self._generados.add((ci, cj))
+                    # El terreno se vuelve a generar para que el RNG local llegue
+                    # al sorteo en el mismo estado, esté o no el chunk cargado
+                    self._poblar(self._mapa_local(ci, cj), ci * t, cj * t)
+
+    def _poblar(self, local, oi, oj):
+        """Enemigos y cofres del chunk, sorteados con su RNG entre celdas alcanzables."""
+        ri, rj = min(self.tam_chunk // 2, local.filas - 1), min(self.tam_chunk // 2, local.columnas - 1)
+        alcanzables, _ = local._alcanzables_desde((ri, rj))
+        xs, ys = np.divmod(alcanzables, local.columnas)
+        xs, ys = xs + oi, ys + oj
+        # Nada encima del jugador ni del portal, ni enemigos pegados al jugador
+        jx, jy = self.jugador.x, self.jugador.y
+        px, py = self.portal
+        libres = ~(((xs == jx) & (ys == jy)) | ((xs == px) & (ys == py)))
+        xs, ys = xs[libres], ys[libres]
+        area = local.filas * local.columnas
+        num_enemigos = min(int(round(area * ENEMIGOS_POR_CELDA)), len(xs))
+        num_cofres = min(int(round(area * COFRES_POR_CELDA)), len(xs) - num_enemigos)
+        lejos = (np.abs(xs - jx) + np.abs(ys - jy)) >= ENEMY_SPAWN_MIN_DIST
+        orden = local.rng.permutation(len(xs))
+        # Enemigos primero entre las celdas lejanas del jugador; cofres en el resto
+        orden = np.concatenate((orden[lejos[orden]], orden[~lejos[orden]]))
+        vision = min(10, 4 + self.nivel_est // 2)
+        k = orden[:num_enemigos]
+        self.entidades.agregar_enemigos(xs[k], ys[k], vision)
+        k = orden[num_enemigos:num_enemigos + num_cofres]
+        self.entidades.agregar_cofres(xs[k], ys[k], *sortear_cofres(local.rng, len(k)))
+
+    # --- Entidades (misma interfaz que Mapa) ---
+    enemigos = Mapa.enemigos
+    cofres = Mapa.cofres
+    mover_enemigos = Mapa.mover_enemigos
+    quitar_enemigo = Mapa.quitar_enemigo
+    colocar_enemigo = Mapa.colocar_enemigo
+    abrir_cofre = Mapa.abrir_cofre
+    enemigos_en = Mapa.enemigos_en
+    cofre_en = Mapa.cofre_en
+    entidades_en_region = Mapa.entidades_en_region
+    flujo_hacia = Mapa.flujo_hacia
+
+    # --- Consultas (misma interfaz que Mapa) ---
+    def es_transitable(self, x, y):
+        """True si (x, y) está dentro del mundo y la celda se puede pisar."""
+        if not (0 <= x < self.filas and 0 <= y < self.columnas):
+            return False
+        t = self.tam_chunk
+        chunk = self._chunk(x // t, y // t)
+        return bool(TRANSITABLE[chunk.celdas.item(x % t, y % t)])
+
+    def transitables(self, xs, ys):
+        """Versión vectorizada de es_transitable: una lectura con índices por cada chunk tocado."""
+        ok = np.zeros(len(xs), dtype=bool)
+        dentro = np.flatnonzero((xs >= 0) & (xs < self.filas) & (ys >= 0) & (ys < self.columnas))
+        if dentro.size == 0:
+            return ok
+        t = self.tam_chunk
+        xs, ys = xs[dentro], ys[dentro]
+        n_cj = -(-self.columnas // t)
+        claves, grupo = np.unique((xs // t) * n_cj + ys // t, return_inverse=True)
+        for k, clave in enumerate(claves.tolist()):
+            sel = grupo == k
+            celdas = self._chunk(*divmod(clave, n_cj)).celdas
+            ok[dentro[sel]] = TRANSITABLE[celdas[xs[sel] % t, ys[sel] % t]]
+        return ok
+
+    def esta_revelado(self, x, y):
+        t = self.tam_chunk
+        return bool(self._chunk(x // t, y // t).revelado[x % t, y % t])
+
+    def region(self, i0, i1, j0, j1):
+        """(celdas, revelado) del rectángulo [i0, i1) x [j0, j1), copiados de los chunks."""
+        i0, j0 = max(0, i0), max(0, j0)
+        i1, j1 = min(self.filas, i1), min(self.columnas, j1)
+        celdas = np.zeros((max(0, i1 - i0), max(0, j1 - j0)), dtype=np.uint8)
+        revelado = np.zeros(celdas.shape, dtype=bool)
+        t = self.tam_chunk
+        for ci in range(i0 // t, (i1 - 1) // t + 1 if i1 > i0 else 0):
+            for cj in range(j0 // t, (j1 - 1) // t + 1 if j1 > j0 else 0):
+                chunk = self._chunk(ci, cj)
+                a0, a1 = max(i0, ci * t), min(i1, ci * t + t)
+                b0, b1 = max(j0, cj * t), min(j1, cj * t + t)
+                celdas[a0 - i0:a1 - i0, b0 - j0:b1 - j0] = chunk.celdas[a0 - ci * t:a1 - ci * t, b0 - cj * t:b1 - cj * t]
+                revelado[a0 - i0:a1 - i0, b0 - j0:b1 - j0] = chunk.revelado[a0 - ci * t:a1 - ci * t, b0 - cj * t:b1 - cj * t]
+        return celdas, revelado
+
+    def revelar_area(self, x, y, radio):
+        """Como Mapa.revelar_area: sello de disco por chunk; devuelve las celdas nuevas (xs, ys).
+
+        También puebla los chunks alrededor de (x, y): es el punto por el que
+        la simulación pasa en cada movimiento del jugador.
+        """
+        self._poblar_alrededor(x, y)
+        t = self.tam_chunk
+        sello = disco(radio)
+        i0, i1 = max(0, x - radio), min(self.filas, x + radio + 1)
+        j0, j1 = max(0, y - radio), min(self.columnas, y + radio + 1)
+        nuevas_x, nuevas_y = [], []
+        for ci in range(i0 // t, (i1 - 1) // t + 1):
+            for cj in range(j0 // t, (j1 - 1) // t + 1):
+                chunk = self._chunk(ci, cj)
+                a0, a1 = max(i0, ci * t), min(i1, ci * t + t)
+                b0, b1 = max(j0, cj * t), min(j1, cj * t + t)
+                parte = sello[a0 - (x - radio):a1 - (x - radio), b0 - (y - radio):b1 - (y - radio)]
+                zona = chunk.revelado[a0 - ci * t:a1 - ci * t, b0 - cj * t:b1 - cj * t]
+                xs, ys = np.nonzero(parte & ~zona)
+                zona |= parte
+                nuevas_x.append(xs + a0)
+                nuevas_y.append(ys + b0)
+        return np.concatenate(nuevas_x), np.concatenate(nuevas_y)
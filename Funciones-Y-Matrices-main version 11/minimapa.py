@@ -0,0 +1,63 @@
+# Minimapa persistente: una Surface de 8 bits con un píxel por celda
+#
+# Cada píxel guarda un índice de paleta (sin revelar, muro, suelo, portal). La
+# Surface se construye una vez por mapa (o al mover la ventana en los mundos
+# por chunks) y después solo se escriben los píxeles de las celdas recién
+# reveladas. La versión escalada se rehace únicamente cuando algo cambió; en
+# cada frame solo se dibujan encima los marcadores de jugador, enemigos y
+# cofres.
+import numpy as np
+import pygame
+
+from config import BLACK, PURPLE
+
+# Índice de paleta = código de celda + 1 (0 queda para "sin revelar")
+PALETA = [BLACK, (60, 60, 60), (0, 140, 0), PURPLE]
+
+
+class Minimapa:
+    def __init__(self):
+        self.mapa = None
+        self.ventana = None      # (i0, i1, j0, j1) que cubre la Surface
+        self._superficie = None  # 8 bits, (columnas, filas) de la ventana
+        self._escalada = None
+        self._tile = None
+
+    def _construir(self, mapa, ventana):
+        i0, i1, j0, j1 = ventana
+        celdas, revelado = mapa.region(i0, i1, j0, j1)
+        superficie = pygame.Surface((j1 - j0, i1 - i0), 0, 8)
+        superficie.set_palette(PALETA)
+        # surfarray indexa (x, y) = (columna, fila): se escribe la traspuesta
+        pixeles = pygame.surfarray.pixels2d(superficie)
+        pixeles[...] = np.where(revelado, celdas + 1, 0).T
+        del pixeles
+        self.mapa = mapa
+        self.ventana = ventana
+        self._superficie = superficie
+        self._escalada = None
+
+    def estampar(self, xs, ys):
+        """Escribe las celdas recién reveladas que caen dentro de la ventana."""
+        if self._superficie is None:
+            return
+        i0, i1, j0, j1 = self.ventana
+        dentro = (xs >= i0) & (xs < i1) & (ys >= j0) & (ys < j1)
+        if not dentro.any():
+            return
+        xs, ys = xs[dentro], ys[dentro]
+        celdas, _ = self.mapa.region(i0, i1, j0, j1)
+        pixeles = pygame.surfarray.pixels2d(self._superficie)
+        pixeles[ys - j0, xs - i0] = celdas[xs - i0, ys - j0] + 1
+        del pixeles
+        self._escalada = None
+
+    def superficie(self, mapa, ventana, tile):
+        """Surface escalada (tile píxeles por celda) de `ventana` en `mapa`."""
+        if mapa is not self.mapa or ventana != self.ventana:
+            self._construir(mapa, ventana)
+        if self._escalada is None or tile != self._tile:
+            i0, i1, j0, j1 = ventana
+            self._escalada = pygame.transform.scale(self._superficie, ((j1 - j0) * tile, (i1 - i0) * tile))
+            self._tile = tile
+        return self._escalada
@@ -0,0 +1,98 @@
+# Perfilado por fases del bucle principal (sin pygame)
+#
+#   with perfil.seccion('dibujar'):
+#       ...
+# Desactivado, seccion() devuelve siempre el mismo objeto vacío: el coste es
+# una llamada y una comprobación. Activado, cada sección guarda su duración en
+# una ventana móvil (para p50/p99 en pantalla) y en una traza acotada que se
+# puede exportar a CSV o al formato de trazas de Chrome (chrome://tracing,
+# Perfetto).
+import csv
+import json
+import time
+from collections import deque
+
+
+class _SeccionNula:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULA = _SeccionNula()
+
+
+class _Seccion:
+    __slots__ = ('perfil', 'nombre', 'inicio')
+
+    def __init__(self, perfil, nombre):
+        self.perfil = perfil
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.perfil.registrar(self.nombre, self.inicio, time.perf_counter_ns())
+        return False
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por el método del más cercano; None si no hay valores."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+class Perfilador:
+    def __init__(self, ventana=240, max_eventos=200_000):
+        self.activo = False
+        self.ventana = ventana
+        self.fases = {}                            # nombre -> deque de duraciones (ms)
+        self.traza = deque(maxlen=max_eventos)     # (nombre, inicio_ns, fin_ns)
+        self._origen = time.perf_counter_ns()
+
+    def alternar(self):
+        self.activo = not self.activo
+        return self.activo
+
+    def seccion(self, nombre):
+        if not self.activo:
+            return _NULA
+        return _Seccion(self, nombre)
+
+    def registrar(self, nombre, inicio_ns, fin_ns):
+        duraciones = self.fases.get(nombre)
+        if duraciones is None:
+            duraciones = self.fases[nombre] = deque(maxlen=self.ventana)
+        duraciones.append((fin_ns - inicio_ns) / 1e6)
+        self.traza.append((nombre, inicio_ns, fin_ns))
+
+    def resumen(self):
+        """[(fase, p50_ms, p99_ms)] de la ventana móvil, en orden de aparición."""
+        return [(nombre, percentil(d, 50), percentil(d, 99)) for nombre, d in self.fases.items()]
+
+    def ultimos(self, nombre):
+        return list(self.fases.get(nombre, ()))
+
+    # --- Exportación ---
+    def exportar_csv(self, ruta):
+        with open(ruta, 'w', newline='', encoding='utf-8') as f:
+            escritor = csv.writer(f)
+            escritor.writerow(['fase', 'inicio_ms', 'duracion_ms'])
+            for nombre, inicio, fin in self.traza:
+                escritor.writerow([nombre, f'{(inicio - self._origen) / 1e6:.3f}', f'{(fin - inicio) / 1e6:.3f}'])
+
+    def exportar_chrome(self, ruta):
+        """Eventos completos ('ph': 'X') con tiempos en microsegundos."""
+        eventos = [{'name': nombre, 'ph': 'X', 'pid': 0, 'tid': 0,
+                    'ts': (inicio - self._origen) / 1e3, 'dur': (fin - inicio) / 1e3}
+                   for nombre, inicio, fin in self.traza]
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': eventos, 'displayTimeUnit': 'ms'}, f)
@@ -0,0 +1,109 @@
+# Pre-generación del siguiente nivel en un proceso aparte
+#
+# El proceso hijo genera el Mapa y escribe la matriz de celdas en un bloque de
+# memoria compartida creado por el proceso principal; por la cola de
+# resultados solo viaja empaquetar() (portal, enemigos, cofres...). El mapa
+# final usa la memoria compartida directamente como base_matriz, sin copiarla.
+# Si se le pasa una caché de niveles, el hijo también escribe ahí el nivel:
+# el cambio de nivel en el proceso principal no toca el disco.
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+from mapa import Mapa
+
+
+def _abrir_compartida(nombre):
+    """Abre un bloque existente; su vida la gestiona el proceso principal."""
+    try:
+        return shared_memory.SharedMemory(name=nombre, track=False)
+    except TypeError:
+        # Python < 3.13: el hijo comparte el resource_tracker del padre y el
+        # registro repetido no tiene efecto; el padre lo borra con unlink()
+        return shared_memory.SharedMemory(name=nombre)
+
+
+def _generar_en_proceso(nombre_shm, filas, columnas, seed, cache_niveles):
+    mapa = Mapa(filas, columnas, seed)
+    mapa.generar_mapa()
+    if cache_niveles is not None:
+        cache_niveles.guardar(mapa)
+    shm = _abrir_compartida(nombre_shm)
+    try:
+        destino = np.ndarray((filas, columnas), dtype=np.uint8, buffer=shm.buf)
+        destino[...] = mapa.base_matriz
+        del destino
+    finally:
+        shm.close()
+    return mapa.empaquetar()
+
+
+def _liberar(shm):
+    try:
+        shm.close()
+        shm.unlink()
+    except Exception:
+        pass
+
+
+class PreGenerador:
+    """Genera en segundo plano un único nivel (filas, columnas, seed) por adelantado."""
+
+    def __init__(self):
+        self._executor = None
+        self._pendiente = None  # ((filas, columnas, seed), future, shm)
+
+    def solicitar(self, filas, columnas, seed, cache_niveles=None):
+        """Empieza a generar el nivel; descarta cualquier petición anterior.
+
+        Con cache_niveles (CacheNiveles) el proceso hijo guarda además el nivel en ella.
+        """
+        self.descartar()
+        shm = None
+        try:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=1)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, filas * columnas))
+            futuro = self._executor.submit(_generar_en_proceso, shm.name, filas, columnas, seed, cache_niveles)
+        except Exception:
+            # Sin procesos o memoria compartida disponibles: se generará en síncrono
+            if shm is not None:
+                _liberar(shm)
+            return
+        self._pendiente = ((filas, columnas, seed), futuro, shm)
+
+    def tomar(self, filas, columnas, seed):
+        """Devuelve el Mapa pre-generado si ya está listo y coincide; si no, None."""
+        if self._pendiente is None:
+            return None
+        clave, futuro, shm = self._pendiente
+        if clave != (filas, columnas, seed) or not futuro.done() or futuro.exception() is not None:
+            self.descartar()
+            return None
+        self._pendiente = None
+        base = np.ndarray((filas, columnas), dtype=np.uint8, buffer=shm.buf)
+        mapa = Mapa.desde_paquete(futuro.result(), base)
+        # El nombre ya no hace falta; la memoria vive mientras el mapa guarde el bloque
+        try:
+            shm.unlink()
+        except Exception:
+            pass
+        mapa.memoria_compartida = shm
+        return mapa
+
+    def descartar(self):
+        """Olvida la petición pendiente y libera su memoria cuando el hijo termine."""
+        if self._pendiente is None:
+            return
+        _, futuro, shm = self._pendiente
+        self._pendiente = None
+        if futuro.done():
+            _liberar(shm)
+        else:
+            futuro.add_done_callback(lambda _f: _liberar(shm))
+
+    def cerrar(self):
+        self.descartar()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
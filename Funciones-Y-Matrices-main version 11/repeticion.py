@@ -0,0 +1,139 @@
+# Grabación y repetición determinista de partidas
+#
+# Una partida queda descrita por la semilla de Simulacion y la lista de
+# acciones aceptadas (las que movieron al jugador): las semillas de los
+# niveles salen del RNG de la simulación y cada Mapa genera terreno,
+# enemigos y cofres con su propio RNG. Junto a cada turno se guarda un hash
+# del estado para comprobar, al repetirla, que la simulación sigue dando
+# exactamente lo mismo.
+#
+# Formato del fichero (little endian):
+#   cabecera  CABECERA (magia, formato, versión del generador, semilla de la
+#             partida, número de niveles y de turnos, y el área a partir de la
+#             cual el nivel fue un MapaChunks)
+#   niveles   n_niveles semillas '<u4' (para diagnosticar, no hacen falta)
+#   acciones  n_turnos bytes, índices de ACCIONES
+#   hashes    n_turnos + 1 '<u8': estado inicial y tras cada turno
+import functools
+import hashlib
+import struct
+import time
+import numpy as np
+
+from mapa import VERSION_GENERADOR
+from config import CHUNK_MODE_MIN_CELLS
+from simulacion import Simulacion, ACCIONES, generar_nivel
+
+MAGIA = b'REPL'
+FORMATO = 2
+CABECERA = struct.Struct('<4sHHQIIQ')
+EXTENSION = '.repl'
+NOMBRES_ACCIONES = list(ACCIONES)
+CODIGO_ACCION = {nombre: k for k, nombre in enumerate(NOMBRES_ACCIONES)}
+
+
+def hash_estado(sim):
+    """Hash de 64 bits de lo que puede cambiar en un turno: jugador, marcador y entidades."""
+    j = sim.mapa.jugador
+    almacen = sim.mapa.entidades
+    h = hashlib.blake2b(digest_size=8)
+    h.update(struct.pack('<iiiiiiiiii', sim.nivel, sim.score_total, j.x, j.y, j.movimientos,
+                         j.corazones_totales, j.corazones_llenos, j.armaduras, j.espadas, j.puntuacion))
+    h.update(sim.estado.encode())
+    n, m = almacen.n_enemigos, almacen.n_cofres
+    for columna in (almacen.ex[:n], almacen.ey[:n], almacen.vivo[:n], almacen.abierto[:m]):
+        h.update(columna.tobytes())
+    return int.from_bytes(h.digest(), 'little')
+
+
+class Repeticion:
+    def __init__(self, semilla, semillas_niveles=(), acciones=(), hashes=(), umbral_chunks=CHUNK_MODE_MIN_CELLS):
+        self.semilla = semilla
+        self.umbral_chunks = umbral_chunks   # el mismo nivel por chunks o entero no es igual
+        self.semillas_niveles = list(semillas_niveles)
+        self.acciones = list(acciones)   # nombres de ACCIONES
+        self.hashes = list(hashes)       # hashes[0] = estado inicial
+
+    @classmethod
+    def empezar(cls, sim, umbral_chunks=CHUNK_MODE_MIN_CELLS):
+        """Grabación vacía de la partida que `sim` acaba de empezar con nuevo_juego()."""
+        return cls(sim.semilla_partida, sim.semillas_niveles, hashes=[hash_estado(sim)],
+                   umbral_chunks=umbral_chunks)
+
+    def registrar(self, accion, sim):
+        """Anota una acción ya aplicada con sim.step() y el estado resultante."""
+        self.acciones.append(accion)
+        self.hashes.append(hash_estado(sim))
+        if len(sim.semillas_niveles) != len(self.semillas_niveles):
+            self.semillas_niveles = list(sim.semillas_niveles)
+
+    def __len__(self):
+        return len(self.acciones)
+
+    # --- Fichero ---
+    def guardar(self, ruta):
+        acciones = np.array([CODIGO_ACCION[a] for a in self.acciones], dtype=np.uint8)
+        with open(ruta, 'wb') as f:
+            f.write(CABECERA.pack(MAGIA, FORMATO, VERSION_GENERADOR, self.semilla,
+                                  len(self.semillas_niveles), len(acciones), self.umbral_chunks))
+            f.write(np.asarray(self.semillas_niveles, dtype='<u4').tobytes())
+            f.write(acciones.tobytes())
+            f.write(np.asarray(self.hashes, dtype='<u8').tobytes())
+
+    @classmethod
+    def cargar(cls, ruta):
+        """Lee una grabación; ValueError si el fichero no es válido o es de otro generador."""
+        with open(ruta, 'rb') as f:
+            datos = f.read()
+        try:
+            magia, formato, version, semilla, n_niveles, n_turnos, umbral = CABECERA.unpack_from(datos)
+        except struct.error:
+            raise ValueError(f'{ruta}: no es una grabación')
+        if magia != MAGIA or formato != FORMATO:
+            raise ValueError(f'{ruta}: no es una grabación (formato {formato})')
+        if version != VERSION_GENERADOR:
+            raise ValueError(f'{ruta}: grabada con el generador v{version}, el actual es v{VERSION_GENERADOR}')
+        if len(datos) != CABECERA.size + 4 * n_niveles + n_turnos + 8 * (n_turnos + 1):
+            raise ValueError(f'{ruta}: fichero truncado')
+        offset = CABECERA.size
+        niveles = np.frombuffer(datos, '<u4', n_niveles, offset)
+        offset += 4 * n_niveles
+        acciones = np.frombuffer(datos, np.uint8, n_turnos, offset)
+        offset += n_turnos
+        hashes = np.frombuffer(datos, '<u8', n_turnos + 1, offset)
+        return cls(semilla, niveles.tolist(), [NOMBRES_ACCIONES[a] for a in acciones.tolist()], hashes.tolist(),
+                   umbral_chunks=umbral)
+
+
+def reproducir(repeticion, proveedor_mapas=None, cronometrar=False):
+    """Repite la partida sin pantalla ni pausas, comprobando el hash de cada turno.
+
+    Sin proveedor_mapas los niveles se generan en síncrono con el umbral de
+    chunks con que se grabó la partida.
+
+    Devuelve un dict con 'turnos' (los repetidos), 'divergencia' (primer turno
+    cuyo estado no coincide, 0 = el inicial, o None), 'niveles' (nivel de cada
+    turno) y 'tiempos_ms' (duración de cada step si cronometrar, si no None).
+    """
+    if proveedor_mapas is None:
+        proveedor_mapas = functools.partial(generar_nivel, umbral_chunks=repeticion.umbral_chunks)
+    sim = Simulacion(semilla=repeticion.semilla, proveedor_mapas=proveedor_mapas)
+    sim.nuevo_juego()
+    resultado = {'turnos': 0, 'divergencia': None, 'niveles': [],
+                 'tiempos_ms': [] if cronometrar else None}
+    if hash_estado(sim) != repeticion.hashes[0]:
+        resultado['divergencia'] = 0
+        return resultado
+    for turno, accion in enumerate(repeticion.acciones, 1):
+        resultado['niveles'].append(sim.nivel)
+        if cronometrar:
+            t = time.perf_counter()
+            sim.step(accion)
+            resultado['tiempos_ms'].append((time.perf_counter() - t) * 1000)
+        else:
+            sim.step(accion)
+        resultado['turnos'] = turno
+        if hash_estado(sim) != repeticion.hashes[turno]:
+            resultado['divergencia'] = turno
+            break
+    return resultado
@@ -0,0 +1,217 @@
+# Núcleo de simulación sin pygame: reglas del juego turno a turno
+#
+# Simulacion.step(accion) aplica una acción del jugador y devuelve la lista de
+# eventos que produjo. Cada evento es una tupla cuyo primer elemento es el tipo:
+#   ('mensaje', texto)           texto temporal para el HUD
+#   ('flash', texto)             puntos ganados ('+50', '+100'...)
+#   ('revelado', xs, ys)         celdas recién reveladas (arrays)
+#   ('cofre', contenido, valor)  cofre abierto
+#   ('espada',)                  enemigo eliminado con una espada
+#   ('empujon',)                 enemigo empujado con una armadura
+#   ('herida', llenos, totales)  el jugador pierde un corazón
+#   ('portal', bonus)            portal alcanzado
+#   ('nivel', nivel)             self.mapa es un mapa nuevo
+#   ('gameover',)                sin corazones: la partida terminó
+# Juego (pygame) solo traduce esos eventos a sonidos, mensajes y dibujo; aquí
+# no se importa pygame, así que puede usarse sin pantalla ni mezclador.
+import random
+
+from config import VISIBLE_RADIUS, CHUNK_MODE_MIN_CELLS
+from config import SCORE_ITEM, SCORE_ENEMY, SCORE_LEVEL, SCORE_LEVEL_BONUS_PER_LEVEL
+from mapa import Mapa
+from mapa_chunks import MapaChunks
+
+# Acciones de step() -> (dx, dy)
+ACCIONES = {
+    'arriba': (-1, 0),
+    'abajo': (1, 0),
+    'izquierda': (0, -1),
+    'derecha': (0, 1),
+}
+
+
+def generar_nivel(filas, columnas, seed, umbral_chunks=CHUNK_MODE_MIN_CELLS):
+    """Proveedor de mapas por defecto: genera en síncrono (por chunks si es enorme)."""
+    if filas * columnas >= umbral_chunks:
+        mapa = MapaChunks(filas, columnas, seed)
+    else:
+        mapa = Mapa(filas, columnas, seed)
+    mapa.generar_mapa()
+    return mapa
+
+
+class Simulacion:
+    def __init__(self, semilla=None, proveedor_mapas=generar_nivel):
+        """proveedor_mapas(filas, columnas, seed) -> mapa ya generado."""
+        self.proveedor_mapas = proveedor_mapas
+        self.semilla = semilla
+        self.semilla_partida = semilla
+        self.rng = random.Random(semilla)
+        self.mapa = None
+        self.nivel = 1
+        self.score_total = 0
+        self.pista_portal = ''
+        self.estado = 'jugando'
+        self.semilla_siguiente = None
+        self.semillas_niveles = []
+
+    def nuevo_juego(self):
+        """Empieza la partida en el nivel 1; devuelve los eventos iniciales."""
+        # Sin semilla fija se sortea una por partida: con ella y las acciones
+        # la partida se puede repetir entera (ver repeticion.py)
+        self.semilla_partida = self.semilla if self.semilla is not None else random.SystemRandom().getrandbits(32)
+        self.rng = random.Random(self.semilla_partida)
+        self.semillas_niveles = []
+        self.mapa = None
+        self.nivel = 1
+        self.score_total = 0
+        self.pista_portal = ''
+        self.estado = 'jugando'
+        self.semilla_siguiente = None
+        eventos = []
+        self.cambiar_mapa(15, 15, eventos)
+        return eventos
+
+    def siguiente_nivel(self):
+        """(filas, columnas, seed) del próximo nivel, conocido desde que empieza el actual."""
+        n = 15 + self.nivel + 1
+        return n, n, self.semilla_siguiente
+
+    def cambiar_mapa(self, filas, columnas, eventos):
+        seed = self.semilla_siguiente if self.semilla_siguiente is not None else self.rng.getrandbits(32)
+        j_prev = self.mapa.jugador if self.mapa is not None else None
+        self.mapa = self.proveedor_mapas(filas, columnas, seed)
+        self.semillas_niveles.append(seed)
+        if j_prev is not None:
+            j = self.mapa.jugador
+            j.corazones_totales = j_prev.corazones_totales
+            j.corazones_llenos = j_prev.corazones_llenos
+            j.armaduras = j_prev.armaduras
+            j.espadas = j_prev.espadas
+            j.puntuacion = j_prev.puntuacion
+        eventos.append(('mensaje', f'--- Nivel {self.nivel} ---'))
+        px, py = self.mapa.portal
+        self.pista_portal = f'({px}, ?)' if self.rng.choice([True, False]) else f'(?, {py})'
+        self.semilla_siguiente = self.rng.getrandbits(32)
+        eventos.append(('nivel', self.nivel))
+
+    def step(self, accion):
+        """Aplica una acción de ACCIONES y devuelve la lista de eventos."""
+        eventos = []
+        if self.estado != 'jugando':
+            return eventos
+        dx, dy = ACCIONES[accion]
+        mapa = self.mapa
+        j = mapa.jugador
+        if not j.mover(dx, dy, mapa):
+            return eventos
+        xs, ys = mapa.revelar_area(j.x, j.y, VISIBLE_RADIUS)
+        if len(xs):
+            eventos.append(('revelado', xs, ys))
+        mapa.mover_enemigos(j)
+        self.verificar_cofre(eventos)
+        self.resolver_colisiones_enemigos(eventos)
+        if self.estado == 'jugando' and self.verificar_portal():
+            level_bonus = SCORE_LEVEL + (self.nivel * SCORE_LEVEL_BONUS_PER_LEVEL)
+            self.score_total += level_bonus
+            eventos.append(('portal', level_bonus))
+            eventos.append(('flash', f'+{level_bonus}'))
+            eventos.append(('mensaje', f'¡Portal encontrado! Bonus nivel {self.nivel}: +{level_bonus} puntos. Pasando al siguiente nivel...'))
+            self.nivel += 1
+            j.corazones_totales += 1
+            self.recargar_corazones(j)
+            self.cambiar_mapa(15 + self.nivel, 15 + self.nivel, eventos)
+        return eventos
+
+    # Reglas
+    def _derrota(self, eventos):
+        eventos.append(('mensaje', '¡Has sido derrotado!'))
+        self.estado = 'gameover'
+        eventos.append(('gameover',))
+
+    def resolver_colisiones_enemigos(self, eventos):
+        j = self.mapa.jugador
+        colisionados = self.mapa.enemigos_en(j.x, j.y)
+        if not colisionados:
+            return False
+        for e in colisionados:
+            if j.espadas > 0:
+                j.espadas -= 1
+                self.mapa.quitar_enemigo(e)
+                self.score_total += SCORE_ENEMY
+                eventos.append(('espada',))
+                eventos.append(('flash', f'+{SCORE_ENEMY}'))
+                eventos.append(('mensaje', 'Usaste una ESPADA: enemigo eliminado!'))
+                continue
+            if j.armaduras > 0:
+                j.armaduras -= 1
+                if self.empujar_enemigo(e, pasos=2):
+                    eventos.append(('empujon',))
+                    eventos.append(('mensaje', 'Usaste ARMADURA: enemigo empujado!'))
+                else:
+                    j.perder_corazon()
+                    eventos.append(('herida', j.corazones_llenos, j.corazones_totales))
+                    eventos.append(('mensaje', f'No se pudo empujar: perdiste un corazón ({j.corazones_llenos}/{j.corazones_totales})'))
+                if j.corazones_llenos == 0:
+                    self._derrota(eventos)
+                    return True
+                continue
+            j.perder_corazon()
+            eventos.append(('herida', j.corazones_llenos, j.corazones_totales))
+            eventos.append(('mensaje', f'¡Perdiste un corazón! ({j.corazones_llenos}/{j.corazones_totales})'))
+            if j.corazones_llenos == 0:
+                self._derrota(eventos)
+                return True
+        return False
+
+    def empujar_enemigo(self, enemigo, pasos=2):
+        dx = enemigo.ultimo_dx
+        dy = enemigo.ultimo_dy
+        if dx == 0 and dy == 0:
+            j = self.mapa.jugador
+            dx = 1 if enemigo.x > j.x else -1 if enemigo.x < j.x else 0
+            dy = 1 if enemigo.y > j.y else -1 if enemigo.y < j.y else 0
+            dx *= -1
+            dy *= -1
+        final_x, final_y = enemigo.x, enemigo.y
+        for step in range(1, pasos + 1):
+            nx = enemigo.x + dx * step
+            ny = enemigo.y + dy * step
+            if self.mapa.es_transitable(nx, ny):
+                final_x, final_y = nx, ny
+            else:
+                break
+        if (final_x, final_y) != (enemigo.x, enemigo.y):
+            self.mapa.colocar_enemigo(enemigo, final_x, final_y)
+            return True
+        return False
+
+    def verificar_cofre(self, eventos):
+        j = self.mapa.jugador
+        c = self.mapa.cofre_en(j.x, j.y)
+        if c is None:
+            return False
+        self.mapa.abrir_cofre(c)
+        eventos.append(('cofre', c.contenido, c.valor))
+        if c.contenido == 'armadura':
+            j.armaduras += 1
+            eventos.append(('mensaje', '¡Cofre abierto! ARMADURA obtenida.'))
+        elif c.contenido == 'espada':
+            j.espadas += 1
+            eventos.append(('mensaje', '¡Cofre abierto! ESPADA obtenida.'))
+        elif c.contenido == 'dinero':
+            j.puntuacion += c.valor
+            eventos.append(('mensaje', f'¡Cofre abierto! Dinero +{c.valor}. Puntos: {j.puntuacion}'))
+        self.score_total += SCORE_ITEM
+        eventos.append(('flash', f'+{SCORE_ITEM}'))
+        return True
+
+    def verificar_portal(self):
+        j = self.mapa.jugador
+        px, py = self.mapa.portal
+        return j.x == px and j.y == py
+
+    def recargar_corazones(self, jugador, costo_por_corazon=100):
+        while jugador.corazones_llenos < jugador.corazones_totales and jugador.puntuacion >= costo_por_corazon:
+            jugador.puntuacion -= costo_por_corazon
+            jugador.corazones_llenos += 1
@@ -0,0 +1,77 @@
+# Pruebas de la lógica del juego (sin pantalla)
+#
+# Uso (desde la carpeta del juego):
+#   python -m pytest -q tests
+# Los módulos del juego se importan por nombre, como en benchmarks/.
+import functools
+import os
+import random
+import sys
+
+CARPETA_JUEGO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CARPETA_JUEGO)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pytest
+
+from simulacion import ACCIONES, generar_nivel
+from mapa_chunks import MapaChunks
+
+
+def mundo_chunks(filas, columnas, seed):
+    """Proveedor de mapas que da siempre un MapaChunks de varios chunks."""
+    mapa = MapaChunks(300, 300, seed)
+    mapa.generar_mapa()
+    return mapa
+
+
+PROVEEDORES = {
+    'mapa': generar_nivel,
+    'chunks': functools.partial(generar_nivel, umbral_chunks=0),
+    'mundo': mundo_chunks,
+}
+
+
+@pytest.fixture(params=sorted(PROVEEDORES))
+def proveedor(request):
+    return PROVEEDORES[request.param]
+
+
+def elegir_accion(sim, rng):
+    """Acción hacia el portal (si el mapa tiene distancias) o al azar con `rng`, evitando a los enemigos."""
+    mapa = sim.mapa
+    j = mapa.jugador
+    enemigos = [(e.x, e.y) for e in mapa.enemigos]
+    destinos = {accion: (j.x + dx, j.y + dy) for accion, (dx, dy) in ACCIONES.items()}
+    opciones = [a for a, (x, y) in destinos.items() if mapa.es_transitable(x, y)] or list(ACCIONES)
+    seguras = [a for a in opciones
+               if all(abs(destinos[a][0] - ex) + abs(destinos[a][1] - ey) > 2 for ex, ey in enemigos)] or opciones
+    if isinstance(mapa, MapaChunks) or rng.random() < 0.2:
+        return rng.choice(seguras)
+    dist = mapa.distancias_desde(mapa.portal)
+    return min(seguras, key=lambda a: (dist[destinos[a]] < 0, dist[destinos[a]]))
+
+
+def jugar(sim, turnos, semilla=0, al_mover=None, inmortal=False):
+    """Juega hasta `turnos` acciones; al_mover(accion) tras cada una que mueva al jugador (como juego.py).
+
+    Con inmortal se rellenan los corazones antes de cada paso para que la
+    partida no acabe (cambia el estado, así que no vale para grabar).
+    """
+    rng = random.Random(semilla)
+    for _ in range(turnos):
+        if sim.estado != 'jugando':
+            break
+        if inmortal:
+            rellenar_corazones(sim)
+        accion = elegir_accion(sim, rng)
+        movimientos = sim.mapa.jugador.movimientos
+        eventos = sim.step(accion)
+        if al_mover is not None and (eventos or sim.mapa.jugador.movimientos != movimientos):
+            al_mover(accion)
+
+
+def rellenar_corazones(sim):
+    j = sim.mapa.jugador
+    j.corazones_totales = j.corazones_llenos = 9
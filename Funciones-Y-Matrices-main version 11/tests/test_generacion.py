@@ -0,0 +1,73 @@
+# Generación de niveles: determinismo, alcanzabilidad y caché en disco
+import numpy as np
+import pytest
+
+from mapa import Mapa
+from mapa_chunks import MapaChunks
+from cache_niveles import CacheNiveles
+
+TAMANOS = (15, 30, 80)
+SEMILLAS = (0, 7, 123456789)
+
+
+def generar(filas, columnas, seed):
+    mapa = Mapa(filas, columnas, seed)
+    mapa.generar_mapa()
+    return mapa
+
+
+def entidades(mapa):
+    """Columnas del almacén que describen un nivel recién generado."""
+    a = mapa.entidades
+    n, m = a.n_enemigos, a.n_cofres
+    return [a.ex[:n], a.ey[:n], a.vision[:n], a.cx[:m], a.cy[:m], a.contenido[:m], a.valor[:m]]
+
+
+def assert_mismo_nivel(a, b):
+    assert np.array_equal(a.base_matriz, b.base_matriz)
+    assert np.array_equal(a.revelado, b.revelado)
+    assert tuple(a.portal) == tuple(b.portal)
+    assert (a.jugador.x, a.jugador.y) == (b.jugador.x, b.jugador.y)
+    for columna_a, columna_b in zip(entidades(a), entidades(b)):
+        assert np.array_equal(columna_a, columna_b)
+
+
+@pytest.mark.parametrize('n', TAMANOS)
+@pytest.mark.parametrize('seed', SEMILLAS)
+def test_misma_semilla_mismo_mapa(n, seed):
+    assert_mismo_nivel(generar(n, n, seed), generar(n, n, seed))
+
+
+def test_misma_semilla_mismo_mundo_por_chunks():
+    a, b = MapaChunks(300, 300, 11), MapaChunks(300, 300, 11, max_cargados=2)
+    a.generar_mapa()
+    b.generar_mapa()
+    # b lee el mundo en otro orden y casi todo pasa por disco: el terreno no
+    # depende de la exploración
+    b.region(200, 300, 200, 300)
+    assert tuple(a.portal) == tuple(b.portal)
+    assert np.array_equal(a.region(0, 300, 0, 300)[0], b.region(0, 300, 0, 300)[0])
+    for columna_a, columna_b in zip(entidades(a), entidades(b)):
+        assert np.array_equal(columna_a, columna_b)
+
+
+@pytest.mark.parametrize('n', TAMANOS)
+@pytest.mark.parametrize('seed', SEMILLAS)
+def test_portal_enemigos_y_cofres_alcanzables(n, seed):
+    mapa = generar(n, n, seed)
+    j = mapa.jugador
+    dist = mapa.distancias_desde((j.x, j.y))
+    assert dist[mapa.portal] > 0
+    a = mapa.entidades
+    assert a.n_enemigos > 0 and a.n_cofres > 0
+    assert (dist[a.ex[:a.n_enemigos], a.ey[:a.n_enemigos]] >= 0).all()
+    assert (dist[a.cx[:a.n_cofres], a.cy[:a.n_cofres]] >= 0).all()
+
+
+@pytest.mark.parametrize('n', TAMANOS)
+def test_cache_niveles_devuelve_el_mismo_nivel(tmp_path, n):
+    cache = CacheNiveles(tmp_path)
+    assert not cache.contiene(n, n, 42)
+    cache.mapa(n, n, 42)
+    assert cache.contiene(n, n, 42)
+    assert_mismo_nivel(cache.cargar(n, n, 42), generar(n, n, 42))
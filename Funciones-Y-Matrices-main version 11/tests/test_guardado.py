@@ -0,0 +1,48 @@
+# Guardar y cargar una partida deja la simulación exactamente donde estaba
+import random
+
+import numpy as np
+import pytest
+
+from simulacion import Simulacion
+from mapa_chunks import MapaChunks
+from repeticion import hash_estado
+from guardado import COMPRESIONES, guardar_partida, cargar_partida
+
+from conftest import jugar, elegir_accion, rellenar_corazones
+
+
+def celdas_y_revelado(mapa):
+    if isinstance(mapa, MapaChunks):
+        j = mapa.jugador
+        return mapa.region(j.x - 80, j.x + 80, j.y - 80, j.y + 80)
+    return mapa.base_matriz, mapa.revelado
+
+
+@pytest.mark.parametrize('compresion', sorted(COMPRESIONES))
+def test_guardar_y_cargar(tmp_path, proveedor, compresion):
+    sim = Simulacion(semilla=5, proveedor_mapas=proveedor)
+    sim.nuevo_juego()
+    # F5 solo guarda durante la partida
+    jugar(sim, 80, inmortal=True)
+    assert sim.estado == 'jugando'
+    ruta = tmp_path / 'partida.sav'
+    guardar_partida(sim, ruta, compresion)
+    cargada = cargar_partida(ruta, proveedor_mapas=proveedor)
+
+    assert hash_estado(cargada) == hash_estado(sim)
+    assert type(cargada.mapa) is type(sim.mapa)
+    assert (cargada.pista_portal, cargada.semilla_siguiente) == (sim.pista_portal, sim.semilla_siguiente)
+    assert cargada.semillas_niveles == sim.semillas_niveles
+    for a, b in zip(celdas_y_revelado(sim.mapa), celdas_y_revelado(cargada.mapa)):
+        assert np.array_equal(a, b)
+
+    # Las dos partidas siguen igual turno a turno (RNG, entidades, niveles nuevos)
+    rng = random.Random(1)
+    for _ in range(200):
+        rellenar_corazones(sim)
+        rellenar_corazones(cargada)
+        accion = elegir_accion(sim, rng)
+        sim.step(accion)
+        cargada.step(accion)
+        assert hash_estado(cargada) == hash_estado(sim)
@@ -0,0 +1,41 @@
+# Una partida grabada se repite sin divergir, también con niveles por chunks
+import functools
+
+import pytest
+
+from simulacion import Simulacion, generar_nivel
+from repeticion import Repeticion, reproducir
+
+from conftest import jugar
+
+
+def grabar(umbral_chunks, turnos=300, semilla=3):
+    proveedor = functools.partial(generar_nivel, umbral_chunks=umbral_chunks)
+    sim = Simulacion(semilla=semilla, proveedor_mapas=proveedor)
+    sim.nuevo_juego()
+    rep = Repeticion.empezar(sim, umbral_chunks)
+    jugar(sim, turnos, al_mover=lambda accion: rep.registrar(accion, sim))
+    return rep, sim
+
+
+@pytest.mark.parametrize('umbral_chunks', [512 * 512, 0], ids=['mapa', 'chunks'])
+def test_grabar_y_repetir(tmp_path, umbral_chunks):
+    rep, sim = grabar(umbral_chunks)
+    assert len(rep) > 0
+    ruta = tmp_path / 'partida.repl'
+    rep.guardar(ruta)
+    leida = Repeticion.cargar(ruta)
+    assert (leida.semilla, leida.umbral_chunks) == (rep.semilla, umbral_chunks)
+    assert (leida.acciones, leida.hashes) == (rep.acciones, rep.hashes)
+
+    resultado = reproducir(leida, cronometrar=True)
+    assert resultado['divergencia'] is None
+    assert resultado['turnos'] == len(rep)
+    assert len(resultado['tiempos_ms']) == len(rep)
+    assert resultado['niveles'][-1] <= sim.nivel
+
+
+def test_repetir_con_otro_umbral_diverge():
+    rep, _ = grabar(512 * 512, turnos=40)
+    rep.umbral_chunks = 0
+    assert reproducir(rep)['divergencia'] is not None